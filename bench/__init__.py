@@ -0,0 +1,11 @@
+"""
+Load testing for the project.
+
+    factories  bulk creation of users and posts (also behind seed_data and
+               import_posts)
+    workloads  weighted mixes of endpoints, built in or read from a JSONL file
+    runner     replays a workload through the test client or over HTTP and
+               reports latency percentiles, throughput and queries per endpoint
+
+Run it with ``manage.py loadtest``.
+"""
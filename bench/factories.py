@@ -0,0 +1,142 @@
+"""
+Bulk factories for seeded and imported data.
+
+Rows are written with bulk_create in batches, so creating thousands of users
+or a million posts costs a few queries per batch rather than several per
+row, and seeded users share one password hash. bulk_create sends no
+signals, so the factories do what the signal handlers would have done:
+create each user's Profile and UserSecurityProfile, index each batch of
+posts and invalidate the feed cache.
+"""
+from datetime import timedelta
+from itertools import islice
+import random
+import secrets
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from blog import feed_cache
+from blog.models import Post
+from blog.search import get_search_backend
+from users.models import Profile, UserSecurityProfile
+
+BATCH_SIZE = 1000
+DEFAULT_PREFIX = 'bench'
+
+WORDS = (
+    'echo', 'signal', 'river', 'morning', 'garden', 'quiet', 'city', 'light',
+    'winter', 'coffee', 'letter', 'window', 'travel', 'music', 'paper', 'stone',
+    'harbor', 'forest', 'thought', 'question', 'story', 'weekend', 'journey',
+    'kitchen', 'library', 'market', 'sunset', 'friend', 'project', 'idea',
+)
+
+
+def username(prefix, index):
+    return f'{prefix}-{index}'
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def random_password():
+    """Fresh password for a seeding run, so no fixture password is ever shared"""
+    return secrets.token_urlsafe(18)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def create_named_users(usernames, password=None, batch_size=BATCH_SIZE):
+    """
+    Create the users among ``usernames`` that do not exist yet, with their
+    profiles. Without a password they cannot log in. Returns a dict of
+    username to id for every name given.
+    """
+    # One hash for every user: hashing is deliberately slow
+    hashed = make_password(password)
+    ids = {}
+    for batch in batched(dict.fromkeys(usernames), batch_size):
+        with transaction.atomic():
+            ids.update(User.objects.filter(username__in=batch).values_list('username', 'pk'))
+            missing = [name for name in batch if name not in ids]
+            if not missing:
+                continue
+            User.objects.bulk_create(
+                [User(username=name, email=f'{name}@example.com', password=hashed) for name in missing]
+            )
+            created = dict(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+            Profile.objects.bulk_create([Profile(user_id=pk) for pk in created.values()])
+            UserSecurityProfile.objects.bulk_create([UserSecurityProfile(user_id=pk) for pk in created.values()])
+            ids.update(created)
+    return ids
+
+
+def create_users(count, prefix=DEFAULT_PREFIX, password=None, batch_size=BATCH_SIZE):
+    """
+    Make sure users ``<prefix>-0`` to ``<prefix>-<count - 1>`` exist, with
+    their profiles. Returns the number of users created.
+    """
+    before = User.objects.filter(username__startswith=f'{prefix}-').count()
+    create_named_users((username(prefix, i) for i in range(count)), password, batch_size)
+    return User.objects.filter(username__startswith=f'{prefix}-').count() - before
+
+
+def set_password(prefix, password):
+    """Give every ``<prefix>-*`` user the same password; returns the number updated"""
+    return User.objects.filter(username__startswith=f'{prefix}-').update(password=make_password(password))
+
+
+def generate_posts(count, author_ids, rng, days=365):
+    """Unsaved posts with random text, spread over the last ``days`` days"""
+    author_ids = list(author_ids)
+    now = timezone.now()
+    for _ in range(count):
+        yield Post(
+            title=words(rng, rng.randint(2, 6)).capitalize(),
+            content='\n\n'.join(
+                words(rng, rng.randint(20, 80)).capitalize() + '.'
+                for _ in range(rng.randint(1, 4))
+            ),
+            author_id=rng.choice(author_ids),
+            date_posted=now - timedelta(seconds=rng.randrange(days * 86400)),
+        )
+
+
+def save_posts(posts, batch_size=BATCH_SIZE, progress=None):
+    """
+    Bulk insert an iterable of unsaved posts, a transaction per batch that
+    also adds the batch to the search index, then invalidate the feed cache.
+    Excerpts are filled in here since bulk_create bypasses Post.save().
+    ``progress`` is called with the running total after each batch. Returns
+    the number saved.
+    """
+    backend = get_search_backend()
+    saved = 0
+    try:
+        for batch in batched(posts, batch_size):
+            for post in batch:
+                post.refresh_excerpt()
+            with transaction.atomic():
+                Post.objects.bulk_create(batch)
+                # Posts without a pk (databases that cannot return ids from a
+                # bulk insert) are picked up by the next rebuild_search_index
+                backend.index_posts([post for post in batch if post.pk is not None])
+            saved += len(batch)
+            if progress:
+                progress(saved)
+    finally:
+        # Also after a failed batch: the earlier ones are committed
+        if saved:
+            feed_cache.invalidate()
+    return saved
+
+
+def create_posts(count, author_ids, rng=None, days=365, batch_size=BATCH_SIZE, progress=None):
+    """Create ``count`` random posts among the authors"""
+    rng = rng or random.Random()
+    return save_posts(generate_posts(count, author_ids, rng, days), batch_size, progress)
@@ -0,0 +1,256 @@
+"""
+Load-test runner.
+
+Virtual users each log in once (session and JWT pair, not measured) and then
+issue the requests of a workload drawn with a seeded RNG, so two runs with
+the same arguments replay the same requests. Two transports:
+
+    ClientTransport  Django's test client, in process. Queries are counted
+                     with a connection execute_wrapper.
+    HTTPTransport    ``requests`` against a running server (runserver,
+                     gunicorn, uvicorn, ...). Queries are read from the
+                     Server-Timing header, so they are only reported when the
+                     server runs with PERF_SERVER_TIMING and PERF_SAMPLE_RATE=1.
+
+Every request comes from a new X-Forwarded-For address, so the per-IP rate
+limits are paid for but never trip.
+"""
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import count
+import json
+import math
+import random
+import re
+import time
+from django.conf import settings
+from django.db import connections
+from .workloads import jwt_obtain, request as make_request
+
+Sample = namedtuple('Sample', 'endpoint status elapsed_ms queries')
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class VirtualUser:
+    def __init__(self, username, session):
+        self.username = username
+        self.session = session
+        self.access = None
+        self.refresh = None
+
+    def take_tokens(self, body):
+        tokens = json.loads(body)
+        self.access = tokens.get('access', self.access)
+        self.refresh = tokens.get('refresh', self.refresh)
+
+
+class ClientTransport:
+    name = 'client'
+
+    def __init__(self):
+        from django.test import Client
+        self.client_class = Client
+        self.secure = getattr(settings, 'SECURE_SSL_REDIRECT', False)
+
+    def new_session(self):
+        return self.client_class()
+
+    def login(self, session, username, password, ip):
+        if not session.login(username=username, password=password):
+            raise RuntimeError(f'Could not log in as {username}')
+
+    def send(self, session, request, ip, token=None):
+        extra = {'HTTP_X_FORWARDED_FOR': ip}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        kwargs = {'secure': self.secure, **extra}
+        if request.json is not None:
+            kwargs.update(data=json.dumps(request.json), content_type='application/json')
+        elif request.data is not None:
+            kwargs['data'] = request.data
+
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            start = time.perf_counter()
+            response = getattr(session, request.method.lower())(request.path, **kwargs)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+        return response.status_code, body, elapsed * 1000, queries
+
+
+class HTTPTransport:
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def new_session(self):
+        return self.requests.Session()
+
+    def login(self, session, username, password, ip):
+        # The login form needs the CSRF cookie from a GET first
+        session.get(f'{self.base_url}/login/', headers={'X-Forwarded-For': ip}, timeout=self.timeout)
+        status, _, _, _ = self.send(
+            session,
+            make_request('POST', '/login/', auth='none', data={'username': username, 'password': password}),
+            ip
+        )
+        if status != 302:
+            raise RuntimeError(f'Could not log in as {username} (HTTP {status})')
+
+    def send(self, session, request, ip, token=None):
+        url = self.base_url + request.path
+        headers = {'X-Forwarded-For': ip, 'Referer': url}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if request.method != 'GET' and 'csrftoken' in session.cookies:
+            headers['X-CSRFToken'] = session.cookies['csrftoken']
+
+        start = time.perf_counter()
+        response = session.request(
+            request.method, url, data=request.data, json=request.json, headers=headers,
+            allow_redirects=False, timeout=self.timeout
+        )
+        body = response.content
+        elapsed = time.perf_counter() - start
+
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        return response.status_code, body, elapsed * 1000, int(match.group(1)) if match else None
+
+
+def _address(number):
+    return f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}'
+
+
+def run(transport, workload, fixture, requests, virtual_users=10, concurrency=1, warmup=0, seed=0):
+    """Replay ``requests`` requests of the workload; returns (samples, seconds)"""
+    rng = random.Random(seed)
+    # next() on a count is atomic, so lanes can share it
+    numbers = count(1)
+    users = []
+    for username in fixture.usernames[:virtual_users]:
+        user = VirtualUser(username, transport.new_session())
+        transport.login(user.session, username, fixture.password, _address(next(numbers)))
+        status, body, _, _ = transport.send(
+            user.session, jwt_obtain(fixture, user, rng), _address(next(numbers))
+        )
+        if status != 200:
+            raise RuntimeError(f'Could not obtain tokens for {username} (HTTP {status})')
+        user.take_tokens(body)
+        users.append(user)
+
+    endpoints = [endpoint for endpoint, _ in workload]
+    weights = [weight for _, weight in workload]
+    plan = [
+        (rng.randrange(len(users)), endpoint)
+        for endpoint in rng.choices(endpoints, weights, k=warmup + requests)
+    ]
+
+    def replay(steps, record, seed):
+        # Each virtual user's requests run in order on one thread
+        samples = []
+        step_rng = random.Random(seed)
+        for user_index, endpoint in steps:
+            user = users[user_index]
+            request = endpoint.build(fixture, user, step_rng)
+            token = user.access if request.auth == 'jwt' else None
+            status, body, elapsed_ms, queries = transport.send(user.session, request, _address(next(numbers)), token)
+            if request.issues_tokens and status == 200:
+                user.take_tokens(body)
+            if record:
+                samples.append(Sample(endpoint.name, status, elapsed_ms, queries))
+        return samples
+
+    replay(plan[:warmup], False, rng.random())
+    plan = plan[warmup:]
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        samples = replay(plan, True, rng.random())
+    else:
+        lanes = defaultdict(list)
+        for step in plan:
+            lanes[step[0] % concurrency].append(step)
+        seeds = [rng.random() for _ in lanes]
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = pool.map(lambda steps, seed: replay(steps, True, seed), lanes.values(), seeds)
+            samples = [sample for lane in results for sample in lane]
+    return samples, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(sample.elapsed_ms for sample in samples)
+    queries = [sample.queries for sample in samples if sample.queries is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample.status >= 400),
+        'status': {str(status): count for status, count in sorted(Counter(s.status for s in samples).items())},
+        'throughput_rps': round(len(samples) / seconds, 2) if seconds else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'p50_ms': _round(percentile(latencies, 0.50)),
+        'p95_ms': _round(percentile(latencies, 0.95)),
+        'p99_ms': _round(percentile(latencies, 0.99)),
+        'max_ms': _round(latencies[-1] if latencies else None),
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def report(samples, seconds):
+    """Totals and per-endpoint figures of a run"""
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    return {
+        'duration_s': round(seconds, 3),
+        'total': summarize(samples, seconds),
+        'endpoints': {
+            name: summarize(endpoint_samples, seconds)
+            for name, endpoint_samples in sorted(by_endpoint.items())
+        },
+    }
+
+
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_mean')
+
+
+def compare(current, baseline):
+    """Relative change of the main figures against an earlier report"""
+    changes = {}
+    rows = [('total', current['total'], baseline.get('total', {}))] + [
+        (name, figures, baseline.get('endpoints', {}).get(name, {}))
+        for name, figures in current['endpoints'].items()
+    ]
+    for name, figures, before in rows:
+        change = {
+            key: round((figures[key] - before[key]) / before[key] * 100, 1)
+            for key in COMPARED
+            if figures.get(key) is not None and before.get(key)
+        }
+        if change:
+            changes[name] = change
+    return changes
@@ -0,0 +1,164 @@
+"""
+Workloads for the load-test runner.
+
+A workload is a list of (endpoint, weight) pairs. An endpoint turns the
+seeded data and a virtual user into one Request; the runner draws endpoints
+by weight. Built-in workloads are in WORKLOADS. Others can be read from a
+JSONL file with one request spec per line:
+
+    {"name": "feed", "method": "GET", "path": "/home/", "auth": "session", "weight": 5}
+    {"name": "comment", "method": "POST", "path": "/api/v1/posts/",
+     "auth": "jwt", "json": {"title": "Hi", "content": "From {username}"}}
+
+``auth`` is "session" (logged in), "jwt" (Bearer access token) or "none".
+Strings in ``path``, ``data`` and ``json`` may use the {post_id},
+{username}, {author} and {cursor} placeholders, which are filled with a
+random seeded post, the virtual user, a random author and a feed cursor.
+Specs that return new tokens set ``"issues_tokens": true``.
+"""
+from collections import namedtuple
+import json
+from blog.pagination import encode_cursor
+
+Request = namedtuple('Request', 'method path auth data json issues_tokens')
+Endpoint = namedtuple('Endpoint', 'name build')
+# What endpoints draw from: seeded usernames, (id, date_posted) of posts and
+# the password every seeded user shares
+Fixture = namedtuple('Fixture', 'usernames posts password')
+
+
+def request(method, path, auth='session', data=None, json=None, issues_tokens=False):
+    return Request(method, path, auth, data, json, issues_tokens)
+
+
+def feed(fixture, user, rng):
+    return request('GET', '/home/')
+
+
+def feed_page(fixture, user, rng):
+    post_id, date_posted = rng.choice(fixture.posts)
+    return request('GET', f'/home/?cursor={encode_cursor((date_posted, post_id))}')
+
+
+def post_detail(fixture, user, rng):
+    return request('GET', f'/post/{rng.choice(fixture.posts)[0]}/')
+
+
+def user_posts(fixture, user, rng):
+    return request('GET', f'/user/{rng.choice(fixture.usernames)}/')
+
+
+def login(fixture, user, rng):
+    return request('POST', '/login/', auth='none', data={
+        'username': user.username, 'password': fixture.password,
+    })
+
+
+def jwt_obtain(fixture, user, rng):
+    return request('POST', '/api/token/', auth='none', issues_tokens=True, json={
+        'username': user.username, 'password': fixture.password,
+    })
+
+
+def jwt_refresh(fixture, user, rng):
+    return request('POST', '/api/token/refresh/', auth='none', issues_tokens=True, json={
+        'refresh': user.refresh,
+    })
+
+
+def api_list(fixture, user, rng):
+    return request('GET', '/api/v1/posts/', auth='jwt')
+
+
+def api_detail(fixture, user, rng):
+    return request('GET', f'/api/v1/posts/{rng.choice(fixture.posts)[0]}/', auth='jwt')
+
+
+def api_create(fixture, user, rng):
+    return request('POST', '/api/v1/posts/', auth='jwt', json={
+        'title': f'Load test post by {user.username}',
+        'content': 'Posted by the load-test runner.',
+    })
+
+
+ENDPOINTS = {
+    function.__name__: Endpoint(function.__name__, function)
+    for function in (
+        feed, feed_page, post_detail, user_posts, login,
+        jwt_obtain, jwt_refresh, api_list, api_detail, api_create,
+    )
+}
+
+
+def _mix(**weights):
+    return [(ENDPOINTS[name], weight) for name, weight in weights.items()]
+
+
+WORKLOADS = {
+    'mixed': _mix(
+        feed=25, feed_page=10, post_detail=20, user_posts=5, login=2,
+        jwt_obtain=3, jwt_refresh=7, api_list=15, api_detail=10, api_create=3,
+    ),
+    'browse': _mix(feed=40, feed_page=20, post_detail=30, user_posts=10),
+    'api': _mix(jwt_obtain=3, jwt_refresh=12, api_list=45, api_detail=30, api_create=10),
+    'auth': _mix(login=40, jwt_obtain=40, jwt_refresh=20),
+}
+
+
+def _fill(value, fields):
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, dict):
+        return {key: _fill(item, fields) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, fields) for item in value]
+    return value
+
+
+def spec_endpoint(spec):
+    """Endpoint replaying one request spec from a workload file"""
+    method = spec.get('method', 'GET').upper()
+    auth = spec.get('auth', 'session')
+    if auth not in ('session', 'jwt', 'none'):
+        raise ValueError(f'Unknown auth {auth!r} in request spec')
+
+    def build(fixture, user, rng):
+        post_id, date_posted = rng.choice(fixture.posts)
+        fields = {
+            'post_id': post_id,
+            'username': user.username,
+            'author': rng.choice(fixture.usernames),
+            'cursor': encode_cursor((date_posted, post_id)),
+        }
+        return request(
+            method, _fill(spec['path'], fields), auth,
+            data=_fill(spec.get('data'), fields),
+            json=_fill(spec.get('json'), fields),
+            issues_tokens=bool(spec.get('issues_tokens')),
+        )
+
+    return Endpoint(spec.get('name') or f'{method} {spec["path"]}', build)
+
+
+def load_workload(path):
+    """Read a workload from a JSONL file of request specs"""
+    workload = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                workload.append((spec_endpoint(spec), spec.get('weight', 1)))
+            except (ValueError, KeyError) as e:
+                raise ValueError(f'{path}:{number}: invalid request spec ({e})')
+    if not workload:
+        raise ValueError(f'{path} holds no request specs')
+    return workload
+
+
+def get_workload(name_or_path):
+    """A built-in workload by name, or one read from a JSONL file"""
+    if name_or_path in WORKLOADS:
+        return WORKLOADS[name_or_path]
+    return load_workload(name_or_path)
@@ -1,11 +1,13 @@
 from rest_framework.throttling import UserRateThrottle
 from django.conf import settings
+from django_blog_project.cache import ratelimit_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 class PostAPIThrottle(UserRateThrottle):
     rate = '100/day' if not settings.DEBUG else '1000/day'
+    cache = ratelimit_cache
     
     def allow_request(self, request, view):
         allowed = super().allow_request(request, view)
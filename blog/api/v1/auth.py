@@ -2,9 +2,9 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.conf import settings
+from users.token_blacklist import CachedRefreshToken
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,7 +30,7 @@ class TokenAuthenticationAPI(APIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
 
             # Generate tokens for authenticated user
-            refresh = RefreshToken.for_user(user)
+            refresh = CachedRefreshToken.for_user(user)
             tokens = {
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -1,5 +1,6 @@
 from rest_framework import permissions
 from django.conf import settings
+from users.security_state import get_security_state
 
 class CustomAPIPermission(permissions.BasePermission):
     """
@@ -19,9 +20,8 @@ class CustomAPIPermission(permissions.BasePermission):
             return False
             
         # Add any additional production checks here
-        if hasattr(request.user, 'usersecurityprofile'):
-            if request.user.usersecurityprofile.is_account_locked():
-                return False
+        if get_security_state(request.user, request).is_locked():
+            return False
         
         return True
 
@@ -12,6 +12,10 @@ urlpatterns = [
         'post': 'create'
     }), name='post-list'),
     
+    path('posts/bulk/', views.PostViewSet.as_view({
+        'post': 'bulk'
+    }), name='post-bulk'),
+    
     path('posts/<int:pk>/', views.PostViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
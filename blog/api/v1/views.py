@@ -1,32 +1,150 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from django.http import StreamingHttpResponse
 from blog.models import Post
-from blog.serializers import PostSerializer
+from blog import bulk, conditional, feed_cache
+from blog.serializers import PostListSerializer, PostSerializer, PostValuesSerializer
+from blog.api.renderers import dumps
+from blog.api.pagination import PostCursorPagination
+from blog.pagination import DEFAULT_ORDERING
+from blog.search import RANKED_ORDERING, search_posts
 from users.authentication import CustomJWTAuthentication
 import logging
 
 logger = logging.getLogger(__name__)
 
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+    queryset = Post.objects.for_feed()
     serializer_class = PostSerializer
     authentication_classes = [CustomJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PostCursorPagination
+    stream_chunk_size = 500
+    bulk_max_operations = 500
+    keyset_ordering = DEFAULT_ORDERING
+    search_param = 'search'
+    max_search_length = 200
+    fields_param = 'fields'
+    # Columns paging and the conditional GET validators need
+    base_columns = ('id', 'date_posted', 'updated_at')
+    
+    def get_sparse_fields(self):
+        """Fields named by ?fields= (None for all); ValidationError for unknown ones"""
+        if not hasattr(self, '_sparse_fields'):
+            value = self.request.query_params.get(self.fields_param)
+            fields = None
+            if value is not None and self.request.method == 'GET':
+                fields = {name.strip() for name in value.split(',') if name.strip()}
+                unknown = fields - set(PostSerializer.Meta.fields)
+                if unknown:
+                    raise ValidationError(f'Unknown fields: {", ".join(sorted(unknown))}')
+            self._sparse_fields = fields
+        return self._sparse_fields
+    
+    def get_serializer_class(self):
+        # Lists send the excerpt, unless the client asks for more (e.g. content)
+        # or streams a full export
+        if self.action == 'list' and self.request.query_params.get('stream') != 'ndjson':
+            fields = self.get_sparse_fields()
+            if fields is None or fields <= set(PostListSerializer.Meta.fields):
+                return PostListSerializer
+        return PostSerializer
+    
+    def get_rendered_fields(self):
+        """Names of the fields a read responds with, in serializer order"""
+        requested = self.get_sparse_fields()
+        fields = self.get_serializer_class().Meta.fields
+        return fields if requested is None else [name for name in fields if name in requested]
+    
+    def values_rows(self, queryset):
+        """
+        (serializer, rows) for the PostValuesSerializer path: named rows with
+        the rendered fields first, then the columns paging and Last-Modified read
+        """
+        serializer = PostValuesSerializer(self.get_rendered_fields())
+        sort_keys = [name.lstrip('-') for name in self.keyset_ordering]
+        columns = serializer.columns(*self.base_columns, *sort_keys)
+        return serializer, queryset.values_list(*columns, named=True)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'] = self.get_sparse_fields()
+        return context
     
     def get_queryset(self):
-        return Post.objects.all().order_by('-date_posted')
+        if self.action in ('list', 'retrieve'):
+            # Read only the columns the response renders; author is sent as an id
+            queryset = Post.objects.only(*self.base_columns, *self.get_rendered_fields())
+        else:
+            queryset = Post.objects.for_feed()
+        query = self.request.query_params.get(self.search_param, '').strip()[:self.max_search_length]
+        if query and self.action == 'list':
+            # Ranked results are paged on (search_rank, id) instead of date
+            self.keyset_ordering = RANKED_ORDERING
+            return search_posts(query, queryset).order_by(*RANKED_ORDERING)
+        return queryset.order_by(*DEFAULT_ORDERING)
+    
+    def stream_ndjson(self, queryset):
+        """Stream every post as newline-delimited JSON in constant memory"""
+        serializer, values = self.values_rows(queryset)
+        
+        def rows():
+            for row in values.iterator(chunk_size=self.stream_chunk_size):
+                yield dumps(serializer.to_representation(row)) + b'\n'
+        
+        response = StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'inline; filename="posts.ndjson"'
+        return response
+    
+    def invalid_fields_response(self, error):
+        return Response({
+            'success': False,
+            'status': status.HTTP_400_BAD_REQUEST,
+            'message': str(error.detail[0])
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            return Response({
+            self.get_sparse_fields()
+        except ValidationError as e:
+            return self.invalid_fields_response(e)
+        
+        if request.query_params.get('stream') == 'ndjson':
+            return self.stream_ndjson(self.get_queryset())
+        
+        # Any post change bumps the feed generation, so this answers polling
+        # clients without touching the database
+        etag = conditional.make_etag('posts', feed_cache.get_generation(), request.get_full_path())
+        not_modified = conditional.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        
+        try:
+            serializer, rows = self.values_rows(self.get_queryset())
+            page = self.paginate_queryset(rows)
+            last_modified = conditional.last_modified_of(page)
+            not_modified = conditional.not_modified(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            
+            response = Response({
                 'success': True,
                 'status': status.HTTP_200_OK,
-                'data': serializer.data,
+                'data': serializer.serialize(page),
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link(),
                 'message': 'Posts retrieved successfully'
             })
+            return conditional.set_validators(response, etag, last_modified)
+        except NotFound as e:
+            return Response({
+                'success': False,
+                'status': status.HTTP_404_NOT_FOUND,
+                'message': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"Error retrieving posts: {str(e)}")
             return Response({
@@ -55,14 +173,26 @@ class PostViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, *args, **kwargs):
+        try:
+            self.get_sparse_fields()
+        except ValidationError as e:
+            return self.invalid_fields_response(e)
+        
         try:
             instance = self.get_object()
+            # Each fieldset is its own representation
+            etag, last_modified = conditional.post_validators(instance, *sorted(self.get_sparse_fields() or ()))
+            not_modified = conditional.not_modified(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            
             serializer = self.get_serializer(instance)
-            return Response({
+            response = Response({
                 'success': True,
                 'status': status.HTTP_200_OK,
                 'data': serializer.data
             })
+            return conditional.set_validators(response, etag, last_modified)
         except Exception as e:
             logger.error(f"Error retrieving post: {str(e)}")
             return Response({
@@ -120,6 +250,42 @@ class PostViewSet(viewsets.ModelViewSet):
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """Create, update and delete many posts in one request (see blog.bulk)"""
+        try:
+            if not isinstance(request.data, dict):
+                raise bulk.InvalidBatch('Request body must be an object with an operations list')
+            result = bulk.apply_operations(
+                request.user,
+                request.data.get('operations'),
+                atomic=request.data.get('atomic', True) is not False,
+                max_operations=self.bulk_max_operations
+            )
+        except bulk.InvalidBatch as e:
+            return Response({
+                'success': False,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if result.failed and not result.applied:
+            logger.warning(f"Bulk post request by {request.user.username} rejected: {result.failed} failed operations")
+            return Response({
+                'success': False,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'data': result.results,
+                'message': f'No changes made: {result.failed} of {len(result.results)} operations failed'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Bulk post request by {request.user.username}: {result.applied} operations applied")
+        return Response({
+            'success': not result.failed,
+            'status': status.HTTP_200_OK,
+            'data': result.results,
+            'message': f'{result.applied} of {len(result.results)} operations applied'
+        })
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
         logger.info(f"Post created by user {self.request.user.username}")
\ No newline at end of file
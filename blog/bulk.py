@@ -0,0 +1,173 @@
+"""
+Bulk create, update and delete of posts for the v1 API.
+
+A batch is a list of operations:
+
+    {"op": "create", "title": "...", "content": "..."}
+    {"op": "update", "id": 12, "title": "..."}        (partial update)
+    {"op": "delete", "id": 13}
+
+Every operation is validated first, and the posts named by updates and
+deletes are loaded with a single query that also serves the ownership check.
+The valid operations are then written in one transaction: one bulk_create,
+one bulk_update and one delete. None of these go through the per-row Post
+signals, so the search index is updated in bulk and the feed cache is
+invalidated once for the whole batch.
+
+Each operation gets a result with its index, post id and an HTTP-style
+status. In an atomic batch (the default) one failed operation means nothing
+is written, and the valid operations get 424.
+"""
+from collections import namedtuple
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from . import feed_cache
+from .models import Post
+from .search import get_search_backend
+from .serializers import PostSerializer
+from .signals import bulk_changes
+
+OPERATIONS = ('create', 'update', 'delete')
+UPDATE_FIELDS = ('title', 'content', 'excerpt', 'date_posted')
+
+BulkResult = namedtuple('BulkResult', 'results applied failed')
+
+
+class InvalidBatch(ValueError):
+    """Raised when the batch itself, rather than an operation, is malformed"""
+
+
+def _is_id(value):
+    # bool is an int subclass, and True == 1 would select post 1
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _result(index, op, post_id, code, errors=None):
+    result = {'index': index, 'op': op, 'id': post_id, 'status': code}
+    if errors is not None:
+        result['errors'] = errors
+    return result
+
+
+def apply_operations(user, operations, atomic=True, max_operations=500):
+    """Validate and apply a batch of operations on behalf of ``user``"""
+    if not isinstance(operations, list) or not operations:
+        raise InvalidBatch('operations must be a non-empty list')
+    if len(operations) > max_operations:
+        raise InvalidBatch(f'At most {max_operations} operations per request')
+
+    ids = {
+        item.get('id') for item in operations
+        if isinstance(item, dict) and item.get('op') in ('update', 'delete') and _is_id(item.get('id'))
+    }
+    # The only read: every post to change, with its author for the ownership check
+    existing = Post.objects.in_bulk(list(ids)) if ids else {}
+
+    results = []
+    creates, updates, deletes = [], [], []
+    seen = {}
+    for index, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        post_id = item.get('id') if isinstance(item, dict) else None
+        if op not in OPERATIONS:
+            results.append(_result(index, op, post_id, status.HTTP_400_BAD_REQUEST, {
+                'op': [f'Must be one of: {", ".join(OPERATIONS)}']
+            }))
+            continue
+
+        if op == 'create':
+            serializer = PostSerializer(data=item)
+            if not serializer.is_valid():
+                results.append(_result(index, op, None, status.HTTP_400_BAD_REQUEST, serializer.errors))
+                continue
+            creates.append((index, Post(author=user, **serializer.validated_data)))
+            results.append(None)
+            continue
+
+        if not _is_id(post_id):
+            results.append(_result(index, op, post_id, status.HTTP_400_BAD_REQUEST, {
+                'id': ['A valid integer is required']
+            }))
+            continue
+        post = existing.get(post_id)
+        if post is None:
+            results.append(_result(index, op, post_id, status.HTTP_404_NOT_FOUND, {'id': ['Post not found']}))
+            continue
+        if post.author_id != user.pk and not user.is_staff:
+            results.append(_result(index, op, post_id, status.HTTP_403_FORBIDDEN, {
+                'id': ['You do not have permission to modify this post']
+            }))
+            continue
+        if post_id in seen:
+            results.append(_result(index, op, post_id, status.HTTP_400_BAD_REQUEST, {
+                'id': [f'Post is already changed by operation {seen[post_id]}']
+            }))
+            continue
+        seen[post_id] = index
+
+        if op == 'delete':
+            deletes.append((index, post))
+            results.append(None)
+            continue
+
+        serializer = PostSerializer(post, data=item, partial=True)
+        if not serializer.is_valid():
+            results.append(_result(index, op, post_id, status.HTTP_400_BAD_REQUEST, serializer.errors))
+            continue
+        for field, value in serializer.validated_data.items():
+            setattr(post, field, value)
+        updates.append((index, post))
+        results.append(None)
+
+    failed = sum(1 for result in results if result is not None)
+    if failed and atomic:
+        for index, result in enumerate(results):
+            if result is None:
+                item = operations[index]
+                results[index] = _result(index, item['op'], item.get('id'), status.HTTP_424_FAILED_DEPENDENCY)
+        return BulkResult(results, 0, failed)
+
+    _write(creates, updates, deletes)
+    for index, post in creates:
+        results[index] = _result(index, 'create', post.pk, status.HTTP_201_CREATED)
+    for index, post in updates:
+        results[index] = _result(index, 'update', post.pk, status.HTTP_200_OK)
+    for index, post in deletes:
+        results[index] = _result(index, 'delete', post.pk, status.HTTP_204_NO_CONTENT)
+    return BulkResult(results, len(creates) + len(updates) + len(deletes), failed)
+
+
+def _write(creates, updates, deletes):
+    created = [post for _, post in creates]
+    updated = [post for _, post in updates]
+    deleted_ids = [post.pk for _, post in deletes]
+    if not (created or updated or deleted_ids):
+        return
+
+    now = timezone.now()
+    for post in created:
+        post.refresh_excerpt()
+    for post in updated:
+        post.refresh_excerpt()
+        # bulk_update does not apply auto_now
+        post.updated_at = now
+
+    backend = get_search_backend()
+    token = bulk_changes.set(True)
+    try:
+        with transaction.atomic():
+            if created:
+                Post.objects.bulk_create(created)
+            if updated:
+                Post.objects.bulk_update(updated, [*UPDATE_FIELDS, 'updated_at'])
+            if deleted_ids:
+                Post.objects.filter(pk__in=deleted_ids).delete()
+                backend.remove_posts(deleted_ids)
+            # Posts without a pk (databases that cannot return ids from a bulk
+            # insert) are picked up by the next rebuild_search_index
+            backend.index_posts([post for post in created + updated if post.pk is not None])
+    finally:
+        bulk_changes.reset(token)
+
+    feed_cache.invalidate_on_commit([post.pk for post in updated] + deleted_ids)
@@ -0,0 +1,45 @@
+"""
+Validators for conditional GET.
+
+Views compute an ETag and Last-Modified value before doing any real work, so
+a matching If-None-Match / If-Modified-Since request is answered with 304
+without rendering a template or running a serializer.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Hash the parts that identify a representation into an ETag"""
+    raw = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+def last_modified_of(posts):
+    """Latest change among a page of posts (or None for an empty page)"""
+    return max((max(post.date_posted, post.updated_at) for post in posts), default=None)
+
+
+def post_validators(post, *vary):
+    """ETag and Last-Modified of a single post"""
+    last_modified = max(post.date_posted, post.updated_at)
+    return make_etag('post', post.pk, last_modified.timestamp(), *vary), last_modified
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Return a 304 response if the request's validators still match"""
+    if request.method not in ('GET', 'HEAD') or (etag is None and last_modified is None):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Attach validators to a full response"""
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
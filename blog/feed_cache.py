@@ -0,0 +1,105 @@
+"""
+Cache of rendered feed pages.
+
+Feed pages live in the pages tier under a generation number. Saving or
+deleting a post, or changing a profile picture, bumps the generation, which
+orphans every cached page at once; the orphans simply expire.
+"""
+import time
+
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django_blog_project.cache import make_key, page_cache
+
+PAGE_TIMEOUT = 600
+ARTICLE_FRAGMENT = 'post_article'
+
+GENERATION_KEY = make_key('feed', 'generation')
+HITS_KEY = make_key('feed', 'stats', 'hits')
+MISSES_KEY = make_key('feed', 'stats', 'misses')
+
+
+def _incr(key):
+    try:
+        return page_cache.incr(key)
+    except ValueError:
+        page_cache.add(key, 1, None)
+        return 1
+
+
+def get_generation():
+    """Return the current feed generation"""
+    generation = page_cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the clock so an evicted counter never reuses an old value
+        page_cache.add(GENERATION_KEY, int(time.time()), None)
+        generation = page_cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate():
+    """Orphan every cached feed page"""
+    try:
+        page_cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def invalidate_articles(post_ids):
+    """Drop the cached article fragments of the given posts"""
+    page_cache.delete_many([
+        make_template_fragment_key(ARTICLE_FRAGMENT, [post_id]) for post_id in post_ids
+    ])
+
+
+def invalidate_on_commit(post_ids=()):
+    """
+    Invalidate once the current transaction commits (at once outside of one).
+    Invalidating before the commit lets a concurrent reader, who still sees
+    the old rows, cache them under the new generation.
+    """
+    post_ids = list(post_ids)
+
+    def run():
+        if post_ids:
+            invalidate_articles(post_ids)
+        invalidate()
+
+    transaction.on_commit(run)
+
+
+def page_key(name, *parts):
+    """Key of a rendered feed page in the current generation"""
+    return make_key('feed', name, get_generation(), *parts)
+
+
+def get_page(key):
+    """Return a cached page entry (or None) and count the hit or miss"""
+    entry = page_cache.get(key)
+    _incr(HITS_KEY if entry is not None else MISSES_KEY)
+    return entry
+
+
+def set_page(key, html):
+    """Store a page's rendered html"""
+    entry = {'html': html}
+    page_cache.set(key, entry, PAGE_TIMEOUT)
+    return entry
+
+
+def get_stats():
+    """Hit and miss counters shared by all workers"""
+    counts = page_cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'generation': get_generation(),
+    }
+
+
+def reset_stats():
+    page_cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,58 @@
+from collections import namedtuple
+import random
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from bench.factories import generate_posts
+from blog.api import renderers
+from blog.serializers import PostListSerializer, PostSerializer, PostValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time serializing and rendering a page of posts held in memory, through the '
+        'model serializers and through the values-row path the v1 list uses. No database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000, help='Posts per run')
+        parser.add_argument('--rounds', type=int, default=3, help='Runs per path; the fastest is reported')
+        parser.add_argument('--random-seed', type=int, default=0, help='Seed for the generated posts')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['random_seed'])
+        posts = list(generate_posts(options['posts'], range(1, 51), rng))
+        for pk, post in enumerate(posts, 1):
+            post.pk = pk
+            post.refresh_excerpt()
+
+        fields = PostListSerializer.Meta.fields
+        values = PostValuesSerializer(fields)
+        Row = namedtuple('Row', values.columns())
+        rows = [Row(*(getattr(post, 'author_id' if name == 'author' else name) for name in Row._fields)) for post in posts]
+
+        json_renderer = JSONRenderer()
+        paths = [
+            ('PostSerializer + JSONRenderer',
+             lambda: json_renderer.render(PostSerializer(posts, many=True).data)),
+            ('PostListSerializer + JSONRenderer',
+             lambda: json_renderer.render(PostListSerializer(posts, many=True).data)),
+            ('values rows + JSONRenderer',
+             lambda: json_renderer.render(values.serialize(rows))),
+        ]
+        if renderers.orjson is not None:
+            paths.append(('values rows + FastJSONRenderer', lambda: renderers.dumps(values.serialize(rows))))
+        else:
+            self.stderr.write('orjson is not installed; FastJSONRenderer is JSONRenderer here')
+
+        self.stdout.write(f'{len(posts)} posts, best of {options["rounds"]}')
+        for name, render in paths:
+            best = None
+            for _ in range(options['rounds']):
+                start = time.perf_counter()
+                body = render()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f'{name:<36} {best * 1000:8.1f} ms {len(posts) / best:>10,.0f} posts/s {len(body):>10,} bytes'
+            )
@@ -0,0 +1,32 @@
+import sys
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.transfer import FORMATS, export_rows, guess_format, write_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Export posts as JSONL or CSV to a file (or - for stdout), reading the table in '
+        'chunks so memory use stays flat however many posts there are'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='File to write, or - for stdout (default)')
+        parser.add_argument('--format', choices=FORMATS, help='Default: csv for .csv files, else jsonl')
+        parser.add_argument('--author', help='Only posts by this username')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or guess_format(path)
+        queryset = Post.objects.all()
+        if options['author']:
+            queryset = queryset.filter(author__username=options['author'])
+
+        rows = export_rows(queryset, options['chunk_size'])
+        if path == '-':
+            write_rows(sys.stdout, rows, format)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            written = write_rows(f, rows, format)
+        self.stdout.write(self.style.SUCCESS(f'Exported {written} posts to {path}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from blog import feed_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the feed page cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the hit/miss counters')
+        parser.add_argument('--invalidate', action='store_true', help='Orphan every cached feed page')
+
+    def handle(self, *args, **options):
+        stats = feed_cache.get_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={stats['hit_ratio']:.2%} generation={stats['generation']}"
+        )
+
+        if options['reset']:
+            feed_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Feed cache counters reset'))
+        if options['invalidate']:
+            feed_cache.invalidate()
+            self.stdout.write(self.style.SUCCESS('Feed cache invalidated'))
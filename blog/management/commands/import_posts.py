@@ -0,0 +1,70 @@
+import sys
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bench.factories import BATCH_SIZE, batched, create_named_users, save_posts
+from blog.transfer import FORMATS, InvalidRow, build_post, guess_format, read_rows
+
+PROGRESS_EVERY = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import posts from a JSONL or CSV file (or - for stdin), streaming it in batches. '
+        'Rows name their author by username. Each batch commits on its own, together with its '
+        'search index entries; the feed cache is invalidated once at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, or - for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='Default: csv for .csv files, else jsonl')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Posts inserted per query')
+        parser.add_argument('--create-authors', action='store_true', help='Create unknown authors (without a usable password)')
+        parser.add_argument('--skip-invalid', action='store_true', help='Report and skip invalid rows instead of stopping')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or guess_format(path)
+        self.skipped = self.reported = 0
+        start = time.perf_counter()
+        f = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            posts = self.build_posts(read_rows(f, format), options)
+            saved = save_posts(posts, options['batch_size'], progress=self.report_progress)
+        except InvalidRow as e:
+            raise CommandError(f'{e}; batches before it were imported')
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {saved} posts in {time.perf_counter() - start:.1f}s'
+            + (f', skipped {self.skipped} invalid rows' if self.skipped else '')
+        ))
+
+    def build_posts(self, rows, options):
+        """Unsaved posts, resolving the authors of each batch with one query"""
+        author_ids = {}
+        now = timezone.now()
+        for batch in batched(rows, options['batch_size']):
+            names = {row.get('author') for _, row in batch} - author_ids.keys() - {None, ''}
+            if names:
+                if options['create_authors']:
+                    author_ids.update(create_named_users(sorted(names)))
+                else:
+                    author_ids.update(User.objects.filter(username__in=names).values_list('username', 'pk'))
+
+            for line, row in batch:
+                try:
+                    yield build_post(line, row, author_ids, now)
+                except InvalidRow as e:
+                    if not options['skip_invalid']:
+                        raise
+                    self.skipped += 1
+                    self.stderr.write(f'Skipped {e}')
+
+    def report_progress(self, saved):
+        if saved // PROGRESS_EVERY > self.reported:
+            self.reported = saved // PROGRESS_EVERY
+            self.stderr.write(f'{saved} posts imported')
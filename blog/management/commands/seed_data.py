@@ -0,0 +1,55 @@
+import random
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from bench import factories
+
+PROGRESS_EVERY = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed users (with their profiles) and random posts using batched bulk inserts. '
+        'Users are named <prefix>-0, <prefix>-1, ... and share one password; existing ones are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users <prefix>-0 to <prefix>-N-1 to make sure exist')
+        parser.add_argument('--posts', type=int, default=1000, help='Posts to add, spread over the seeded users')
+        parser.add_argument('--prefix', default=factories.DEFAULT_PREFIX, help='Username prefix')
+        parser.add_argument('--password', help='Password of the new users (default: a random one, printed)')
+        parser.add_argument('--days', type=int, default=365, help='Spread post dates over this many past days')
+        parser.add_argument('--batch-size', type=int, default=factories.BATCH_SIZE, help='Rows inserted per query')
+        parser.add_argument('--random-seed', type=int, help='Seed for reproducible posts')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        password = options['password'] or factories.random_password()
+        start = time.perf_counter()
+        created = factories.create_users(options['users'], prefix, password, options['batch_size'])
+        self.stdout.write(f'Created {created} users in {time.perf_counter() - start:.1f}s')
+        if created and not options['password']:
+            self.stdout.write(f'New users log in with password {password}')
+
+        if not options['posts']:
+            return
+        author_ids = list(User.objects.filter(username__startswith=f'{prefix}-').values_list('pk', flat=True))
+        if not author_ids:
+            raise CommandError(f'No {prefix}-* users to author the posts; use --users')
+
+        start = time.perf_counter()
+        reported = [0]
+
+        def progress(saved):
+            if saved // PROGRESS_EVERY > reported[0]:
+                reported[0] = saved // PROGRESS_EVERY
+                self.stderr.write(f'{saved} posts created')
+
+        saved = factories.create_posts(
+            options['posts'], author_ids, random.Random(options['random_seed']),
+            days=options['days'], batch_size=options['batch_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {saved} posts in {time.perf_counter() - start:.1f}s '
+            f'(search index updated, feed cache invalidated)'
+        ))
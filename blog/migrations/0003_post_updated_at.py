@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:07
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(updated_at=models.F('date_posted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
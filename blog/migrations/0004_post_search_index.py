@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# The search index is vendor specific, so it is created with raw SQL rather
+# than as a model field (see blog/search.py)
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE blog_post_search (
+        post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX blog_post_search_document_idx ON blog_post_search USING GIN (document)",
+    """
+    INSERT INTO blog_post_search (post_id, document)
+    SELECT id, setweight(to_tsvector('english', title), 'A') ||
+               setweight(to_tsvector('english', content), 'B')
+    FROM blog_post
+    """,
+]
+POSTGRES_REVERSE = ["DROP TABLE IF EXISTS blog_post_search"]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE blog_post_fts USING fts5(
+        title, content, tokenize = 'porter unicode61'
+    )
+    """,
+    "INSERT INTO blog_post_fts (rowid, title, content) SELECT id, title, content FROM blog_post",
+]
+SQLITE_REVERSE = ["DROP TABLE IF EXISTS blog_post_fts"]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_REVERSE, SQLITE_REVERSE),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+def make_excerpt(content, length=200):
+    # Frozen copy of blog.models.make_excerpt
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut[:length - 1].rstrip() + '\u2026'
+
+
+def backfill_excerpts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'content').iterator(chunk_size=2000):
+        post.excerpt = make_excerpt(post.content)
+        batch.append(post)
+        if len(batch) == 2000:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
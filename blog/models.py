@@ -3,16 +3,71 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """Start of the content with whitespace collapsed, cut at a word boundary"""
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut[:length - 1].rstrip() + '\u2026'
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Posts with author and profile joined in, limited to rendered columns"""
+        return self.select_related('author', 'author__profile').only(
+            'id',
+            'title',
+            'content',
+            'date_posted',
+            'updated_at',
+            'author__id',
+            'author__username',
+            'author__profile__id',
+            'author__profile__profile_picture',
+            'author__profile__avatar_variants',
+        )
+
 
 class Post(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField()
     date_posted = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Stored so list responses can skip content entirely (see refresh_excerpt)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the home feed on (date_posted, id)
+            models.Index(fields=['-date_posted', '-id'], name='blog_post_date_id_idx'),
+            # Keyset pagination of a single author's posts
+            models.Index(fields=['author', '-date_posted'], name='blog_post_author_date_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     def get_absolute_url(self):
         return reverse('post-detail', kwargs={'pk': self.pk})
+
+    def refresh_excerpt(self):
+        """Recompute the excerpt; bulk_create/bulk_update callers must call this"""
+        self.excerpt = make_excerpt(self.content)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            self.refresh_excerpt()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
     
@@ -0,0 +1,181 @@
+"""
+Keyset (cursor) pagination for post listings.
+
+Offset pagination needs a COUNT(*) and an OFFSET scan that grows with the page
+number. Keyset pagination instead filters on the sort key of the last row that
+was shown, so with a matching index every page costs the same as the first one.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+DEFAULT_ORDERING = ('-date_posted', '-id')
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(values, reverse=False):
+    """Encode the sort key of a row into an opaque, URL-safe token"""
+    payload = {
+        'v': [value.isoformat() if isinstance(value, datetime) else value for value in values],
+    }
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token into its raw key values and direction"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return list(payload['v']), bool(payload.get('r'))
+    except (TypeError, ValueError, KeyError, binascii.Error) as e:
+        raise InvalidCursor(str(e))
+
+
+class KeysetPage:
+    """A single page of results plus the cursors pointing either side of it"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on a unique, ordered key such as (date_posted, id).
+
+    The last ordering field must be unique so that rows sharing the leading
+    values still have a strict position.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _to_python(self, name, value):
+        """Convert a decoded cursor value back to the field's Python type"""
+        # Encoded keys are never null: the seek filter cannot compare with NULL
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise InvalidCursor(f'Invalid value for {name}')
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # The only annotation paginated on is a search rank, a float
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise InvalidCursor(f'Invalid value for {name}')
+            if not math.isfinite(value):
+                raise InvalidCursor(f'Invalid value for {name}')
+            return value
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+        if value is None:
+            raise InvalidCursor(f'Invalid value for {name}')
+        return value
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name, _ in self.fields]
+
+    def _seek(self, values, backwards):
+        """Build the filter selecting rows strictly after (or before) a key"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            branch = Q(**{f'{name}__{lookup}': values[i]})
+            for j, (prev_name, _) in enumerate(self.fields[:i]):
+                branch &= Q(**{prev_name: values[j]})
+            condition |= branch
+        return condition
+
+    def page(self, cursor=None):
+        """Return the page following (or preceding) the given cursor"""
+        queryset = self.queryset
+        backwards = False
+
+        if cursor:
+            raw_values, backwards = decode_cursor(cursor)
+            if len(raw_values) != len(self.fields):
+                raise InvalidCursor('Cursor does not match the ordering')
+            values = [
+                self._to_python(name, value)
+                for (name, _), value in zip(self.fields, raw_values)
+            ]
+            queryset = queryset.filter(self._seek(values, backwards))
+
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        else:
+            ordering = list(self.ordering)
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_next:
+                next_cursor = encode_cursor(self._key(rows[-1]))
+            if has_previous:
+                previous_cursor = encode_cursor(self._key(rows[0]), reverse=True)
+
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that swaps Django's offset paginator for keyset pagination.
+
+    Templates get ``page_obj.next_cursor``/``page_obj.previous_cursor`` to
+    build links with the ``?cursor=`` query parameter.
+    """
+    cursor_kwarg = 'cursor'
+    keyset_ordering = DEFAULT_ORDERING
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,194 @@
+"""
+Full-text search over post titles and content.
+
+Each database gets its own index, kept current by the Post signals (or by
+blog.bulk for bulk changes, which send none):
+  - PostgreSQL: a weighted tsvector per post in ``blog_post_search`` with a
+    GIN index, queried with websearch_to_tsquery and ranked by ts_rank_cd.
+  - SQLite: an FTS5 table ``blog_post_fts`` keyed by the post id, ranked
+    by bm25.
+Other databases fall back to unindexed ``icontains`` matching.
+
+``search_posts`` annotates matches with ``search_rank`` (higher is better) so
+results can be keyset-paginated on RANKED_ORDERING.
+"""
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+RANKED_ORDERING = ('-search_rank', '-id')
+SEARCH_CONFIG = 'english'
+
+
+class BaseSearchBackend:
+    def index_post(self, post):
+        """Add or refresh a post in the index"""
+
+    def remove_post(self, post_id):
+        """Drop a post from the index"""
+
+    def index_posts(self, posts):
+        """Add or refresh many posts"""
+        for post in posts:
+            self.index_post(post)
+
+    def remove_posts(self, post_ids):
+        """Drop many posts"""
+        for post_id in post_ids:
+            self.remove_post(post_id)
+
+    def rebuild(self):
+        """Re-index every post"""
+
+    def search(self, queryset, query):
+        """Filter a Post queryset to matches annotated with search_rank"""
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    table = 'blog_post_search'
+    document_sql = (
+        "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, %s), 'B')"
+    )
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (post_id, document) VALUES (%s, {self.document_sql}) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [post.pk, SEARCH_CONFIG, post.title, SEARCH_CONFIG, post.content]
+            )
+
+    def index_posts(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (post_id, document) VALUES (%s, {self.document_sql}) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [[post.pk, SEARCH_CONFIG, post.title, SEARCH_CONFIG, post.content] for post in posts]
+            )
+
+    def remove_post(self, post_id):
+        self.remove_posts([post_id])
+
+    def remove_posts(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE post_id = ANY(%s)", [list(post_ids)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (post_id, document) "
+                f"SELECT id, setweight(to_tsvector(%s::regconfig, title), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, content), 'B') FROM blog_post",
+                [SEARCH_CONFIG, SEARCH_CONFIG]
+            )
+
+    def search(self, queryset, query):
+        tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT post_id FROM {self.table} WHERE document @@ {tsquery}",
+                [SEARCH_CONFIG, query]
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT ts_rank_cd(document, {tsquery})::float8 FROM {self.table} "
+                f"WHERE post_id = blog_post.id",
+                [SEARCH_CONFIG, query],
+                output_field=FloatField()
+            )
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    table = 'blog_post_fts'
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            # FTS5 tables have no upsert
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)",
+                [post.pk, post.title, post.content]
+            )
+
+    def index_posts(self, posts):
+        posts = list(posts)
+        self.remove_posts([post.pk for post in posts])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)",
+                [[post.pk, post.title, post.content] for post in posts]
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def remove_posts(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [[post_id] for post_id in post_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) "
+                f"SELECT id, title, content FROM blog_post"
+            )
+
+    @staticmethod
+    def to_match_expression(query):
+        """Quote every term so user input cannot inject FTS5 syntax"""
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+    def search(self, queryset, query):
+        match = self.to_match_expression(query)
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s",
+                [match]
+            )
+        ).annotate(
+            # bm25() is lower for better matches; titles weigh ten times content
+            search_rank=RawSQL(
+                f"SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s AND rowid = blog_post.id",
+                [match],
+                output_field=FloatField()
+            )
+        )
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """Unindexed substring matching for databases without a search index"""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in query.split():
+            condition &= Q(title__icontains=term) | Q(content__icontains=term)
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+_backends = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the search backend matching the default database"""
+    return _backends.get(connection.vendor, FallbackSearchBackend)()
+
+
+def search_posts(query, queryset):
+    """Ranked matches for a query, or an empty queryset for a blank query"""
+    query = (query or '').strip()
+    if not query:
+        # Keep the annotation so callers can still order on RANKED_ORDERING
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return get_search_backend().search(queryset, query)
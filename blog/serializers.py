@@ -1,8 +1,81 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Post
 
-class PostSerializer(serializers.ModelSerializer):
+
+class SparseFieldsetMixin:
+    """
+    Drops every field not named in ``context['fields']`` (a set, or None for
+    all of them) before anything is serialized, so unrequested fields cost
+    neither CPU nor bytes. Views fill it from the ``?fields=`` parameter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'content', 'excerpt', 'date_posted', 'author']
+        read_only_fields = ['author', 'excerpt']
+
+
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """List representation: the stored excerpt instead of the content"""
+
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'date_posted', 'author']
-        read_only_fields = ['author']
\ No newline at end of file
+        fields = ['id', 'title', 'excerpt', 'date_posted', 'author']
+        read_only_fields = fields
+
+
+class PostValuesSerializer:
+    """
+    Read-only fast path producing the same dicts as PostSerializer, but from
+    ``values_list(*serializer.columns(), named=True)`` rows: no model
+    instances are built and no serializer field is called per value. Only
+    the datetime fields need formatting; the other columns are already JSON
+    types. The rendered fields come first in a row, so they are read by
+    position.
+    """
+    datetime_fields = ('date_posted',)
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        iso = api_settings.DATETIME_FORMAT == ISO_8601
+        # Resolved once per response, as DRF's DateTimeField does per value
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        format_datetime = self.format_datetime if iso else serializers.DateTimeField().to_representation
+        self.formatters = [
+            (name, format_datetime if name in self.datetime_fields else None)
+            for name in self.fields
+        ]
+
+    def columns(self, *extra):
+        """Columns to select: the rendered fields, then any others (e.g. sort keys)"""
+        return tuple(dict.fromkeys([*self.fields, *extra]))
+
+    def format_datetime(self, value):
+        # DateTimeField.to_representation for the ISO 8601 format
+        if value is None:
+            return None
+        if self.timezone is not None and timezone.is_aware(value):
+            value = value.astimezone(self.timezone)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+    def to_representation(self, row):
+        return {
+            name: row[index] if formatter is None else formatter(row[index])
+            for index, (name, formatter) in enumerate(self.formatters)
+        }
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
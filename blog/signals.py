@@ -0,0 +1,81 @@
+from contextvars import ContextVar
+from django.db.models.signals import post_save, post_delete, post_init
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from users.models import Profile
+from .models import Post
+from . import feed_cache
+from .search import get_search_backend
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Set by blog.bulk, which refreshes the feed cache and search index once for
+# a whole batch of posts
+bulk_changes = ContextVar('blog_bulk_changes', default=False)
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feed_for_post(sender, instance, **kwargs):
+    """Drop cached feed pages and the post's article fragment"""
+    if bulk_changes.get():
+        return
+    feed_cache.invalidate_on_commit([instance.pk])
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    """Keep the full-text index in step with the post (same transaction)"""
+    if raw or bulk_changes.get():
+        return
+    get_search_backend().index_post(instance)
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    if bulk_changes.get():
+        return
+    get_search_backend().remove_post(instance.pk)
+
+def _avatar_state(profile):
+    """Picture name and derivative set, read raw so deferred fields are not fetched"""
+    picture = profile.__dict__.get('profile_picture')
+    variants = profile.__dict__.get('avatar_variants')
+    return (
+        str(picture) if picture is not None else None,
+        variants.get('source') if isinstance(variants, dict) else None,
+    )
+
+@receiver(post_init, sender=Profile)
+def remember_profile_picture(sender, instance, **kwargs):
+    """Keep the loaded avatar state so saves can tell whether it changed"""
+    instance._feed_avatar = _avatar_state(instance)
+
+def _invalidate_author(user_id):
+    post_ids = Post.objects.filter(author_id=user_id).values_list('pk', flat=True)
+    feed_cache.invalidate_on_commit(post_ids)
+
+@receiver(post_save, sender=Profile)
+def invalidate_feed_for_profile(sender, instance, created, **kwargs):
+    """Avatars are rendered into every article, so refresh the author's posts"""
+    avatar = _avatar_state(instance)
+    if created or avatar == instance._feed_avatar:
+        return
+    instance._feed_avatar = avatar
+    
+    _invalidate_author(instance.user_id)
+    logger.info(f"Invalidated feed cache after avatar change for user {instance.user_id}")
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Read raw: a deferred username is not fetched just to remember it
+    instance._feed_username = instance.__dict__.get('username')
+
+@receiver(post_save, sender=User)
+def invalidate_feed_for_user(sender, instance, created, **kwargs):
+    """Articles show the author's name and link to their posts by username"""
+    username = instance.__dict__.get('username')
+    if created or username == instance._feed_username:
+        return
+    instance._feed_username = username
+    
+    _invalidate_author(instance.pk)
+    logger.info(f"Invalidated feed cache after username change for user {instance.pk}")
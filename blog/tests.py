@@ -0,0 +1,551 @@
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from blog.api.pagination import PostCursorPagination
+from blog.api.renderers import FastJSONRenderer
+from blog.models import Post
+from blog.pagination import InvalidCursor, KeysetPaginator, encode_cursor
+from bench import factories
+from blog.search import RANKED_ORDERING, get_search_backend, search_posts
+from blog.serializers import PostListSerializer, PostSerializer
+from users.models import Profile, UserSecurityProfile
+from users.token_blacklist import CachedRefreshToken
+from django_blog_project.cache import page_cache
+
+
+class FeedQueryCountTests(TestCase):
+    """Rendering a page of posts must not issue a query per author or avatar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(f'author{i}', f'author{i}@example.com', 'password')
+            for i in range(5)
+        ]
+        for author in cls.authors:
+            Post.objects.create(title=f'Post by {author.username}', content='Body', author=author)
+
+    def setUp(self):
+        page_cache.clear()
+        self.client.force_login(self.authors[0])
+
+    def test_home_feed_query_count(self):
+        # session + user + one joined page query on a cold feed cache
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blog-home'))
+        self.assertEqual(len(response.context['posts']), 5)
+
+    def test_cached_home_feed_skips_post_query(self):
+        self.client.get(reverse('blog-home'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response['X-Feed-Cache'], 'HIT')
+        self.assertContains(response, 'Post by author4')
+
+    def test_post_save_invalidates_feed(self):
+        self.client.get(reverse('blog-home'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(title='Fresh post', content='Body', author=self.authors[1])
+            # Until the commit, other readers would cache the old feed again
+            response = self.client.get(reverse('blog-home'))
+            self.assertEqual(response['X-Feed-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response['X-Feed-Cache'], 'MISS')
+        self.assertContains(response, 'Fresh post')
+
+    def test_username_change_invalidates_feed(self):
+        self.client.get(reverse('blog-home'))
+        author = User.objects.get(pk=self.authors[1].pk)
+        author.save()
+        self.assertEqual(self.client.get(reverse('blog-home'))['X-Feed-Cache'], 'HIT')
+
+        author.username = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response['X-Feed-Cache'], 'MISS')
+        self.assertContains(response, reverse('user-posts', kwargs={'username': 'renamed'}))
+
+    def test_user_posts_query_count(self):
+        # session + user + author lookup + page query + post count
+        with self.assertNumQueries(5):
+            self.client.get(reverse('user-posts', kwargs={'username': 'author1'}))
+
+    def test_post_detail_query_count(self):
+        post = Post.objects.first()
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/post/{post.pk}/')
+        self.assertEqual(response.context['object'], post)
+
+
+class ConditionalGetTests(TestCase):
+    """Feed, detail and API list answer a matching If-None-Match with 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'password')
+        cls.post = Post.objects.create(title='Cached post', content='Body', author=cls.author)
+
+    def setUp(self):
+        page_cache.clear()
+        self.client.force_login(self.author)
+
+    def edit_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Edited post'
+            self.post.save()
+
+    def assert_revalidates(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers).status_code, 304)
+
+        self.edit_post()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def assert_not_shared(self, url):
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail(self):
+        url = f'/post/{self.post.pk}/'
+        response = self.assert_revalidates(url)
+        self.assertContains(response, 'Edited post')
+        # The same post for every viewer, but not the same page
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_detail_is_per_user(self):
+        self.assert_not_shared(f'/post/{self.post.pk}/')
+
+    def test_feed(self):
+        response = self.assert_revalidates(reverse('blog-home'))
+        self.assertEqual(response['X-Feed-Cache'], 'MISS')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_feed_is_per_user(self):
+        self.assert_not_shared(reverse('blog-home'))
+
+    def test_api_list(self):
+        token = CachedRefreshToken.for_user(self.author).access_token
+        response = self.assert_revalidates('/api/v1/posts/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.json()['data'][0]['title'], 'Edited post')
+
+
+class PostTransferTests(TestCase):
+    """Bulk seeding and the streaming post import/export commands"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_seed_data_creates_profiles_in_bulk(self):
+        call_command('seed_data', users=4, posts=30, random_seed=1, stdout=io.StringIO(), stderr=io.StringIO())
+        users = User.objects.filter(username__startswith='bench-')
+        self.assertEqual(users.count(), 4)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 4)
+        self.assertEqual(UserSecurityProfile.objects.filter(user__in=users).count(), 4)
+        self.assertEqual(Post.objects.count(), 30)
+
+    def test_saved_batches_are_indexed_without_a_rebuild(self):
+        author = User.objects.create_user('seeder', 'seeder@example.com', 'password')
+        existing = Post.objects.create(title='Lighthouse notes', content='Body', author=author)
+        posts = [Post(title=f'Lighthouse {i}', content='Body', author=author) for i in range(10)]
+
+        backend = type(get_search_backend())
+        with mock.patch.object(backend, 'rebuild') as rebuild, \
+                mock.patch.object(backend, 'index_posts', autospec=True, side_effect=backend.index_posts) as index:
+            self.assertEqual(factories.save_posts(posts, batch_size=4), 10)
+        rebuild.assert_not_called()
+        self.assertEqual([len(call.args[1]) for call in index.call_args_list], [4, 4, 2])
+        matches = search_posts('lighthouse', Post.objects.all())
+        self.assertEqual(set(matches), {existing, *posts})
+
+    def test_export_and_import_round_trip(self):
+        author = User.objects.create_user('exporter', 'exporter@example.com', 'password')
+        Post.objects.create(title='Commas, "quotes"', content='Two\nlines', author=author)
+        Post.objects.create(title='Second', content='Body', author=author)
+
+        for format in ('csv', 'jsonl'):
+            call_command('export_posts', self.path(f'posts.{format}'), stdout=io.StringIO())
+        Post.objects.all().delete()
+        author.delete()
+
+        call_command('import_posts', self.path('posts.csv'), create_authors=True, stdout=io.StringIO())
+        call_command('import_posts', self.path('posts.jsonl'), stdout=io.StringIO())
+        imported = User.objects.get(username='exporter')
+        self.assertFalse(imported.has_usable_password())
+        self.assertTrue(Profile.objects.filter(user=imported).exists())
+        self.assertEqual(
+            sorted(Post.objects.values_list('title', 'content')),
+            sorted([('Commas, "quotes"', 'Two\nlines'), ('Second', 'Body')] * 2)
+        )
+
+        self.client.force_login(imported)
+        response = self.client.get(reverse('post-search'), {'q': 'quotes'})
+        self.assertEqual(len(response.context['posts']), 2)
+
+    def test_import_stops_at_invalid_row(self):
+        with open(self.path('posts.jsonl'), 'w') as f:
+            f.write('{"title": "Orphan", "content": "Body", "author": "nobody"}\n')
+        with self.assertRaisesMessage(CommandError, "line 1: unknown author 'nobody'"):
+            call_command('import_posts', self.path('posts.jsonl'), stdout=io.StringIO())
+        self.assertFalse(Post.objects.exists())
+
+
+class BulkPostApiTests(TestCase):
+    """POST /api/v1/posts/bulk/ applies many operations in one request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('syncer', 'syncer@example.com', 'password')
+        cls.other = User.objects.create_user('bystander', 'bystander@example.com', 'password')
+        cls.own = Post.objects.create(title='Own post', content='Body', author=cls.user)
+        cls.doomed = Post.objects.create(title='Doomed post', content='Body', author=cls.user)
+        cls.foreign = Post.objects.create(title='Foreign post', content='Body', author=cls.other)
+
+    def post_bulk(self, operations, **extra):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        return self.client.post(
+            reverse('post-bulk'), {'operations': operations, **extra},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def creates(self, count):
+        return [{'op': 'create', 'title': f'Synced {i}', 'content': 'Body'} for i in range(count)]
+
+    def test_mixed_batch_is_applied_with_per_item_results(self):
+        response = self.post_bulk(self.creates(2) + [
+            {'op': 'update', 'id': self.own.pk, 'title': 'Renamed post'},
+            {'op': 'delete', 'id': self.doomed.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results], [201, 201, 200, 204])
+        self.assertEqual(
+            set(Post.objects.filter(author=self.user).values_list('title', flat=True)),
+            {'Synced 0', 'Synced 1', 'Renamed post'}
+        )
+        self.assertEqual(results[0]['id'], Post.objects.get(title='Synced 0').pk)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post-search'), {'q': 'renamed'})
+        self.assertEqual([post.pk for post in response.context['posts']], [self.own.pk])
+        response = self.client.get(reverse('post-search'), {'q': 'doomed'})
+        self.assertEqual(len(response.context['posts']), 0)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        counts = []
+        for size in (2, 40):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post_bulk(self.creates(size)).status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_atomic_batch_with_a_failure_changes_nothing(self):
+        response = self.post_bulk(self.creates(1) + [
+            {'op': 'update', 'id': self.foreign.pk, 'title': 'Hijacked'},
+            {'op': 'delete', 'id': 999999},
+            {'op': 'update', 'id': self.own.pk, 'title': ''},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['data']], [424, 403, 404, 400])
+        self.assertEqual(Post.objects.count(), 3)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.title, 'Foreign post')
+
+    def test_ids_must_be_integers(self):
+        response = self.post_bulk([
+            {'op': 'delete', 'id': True},
+            {'op': 'update', 'id': str(self.own.pk), 'title': 'Renamed'},
+            {'op': 'delete', 'id': self.own.pk},
+        ], atomic=False)
+        self.assertEqual([result['status'] for result in response.json()['data']], [400, 400, 204])
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(Post.objects.filter(pk=self.doomed.pk).exists())
+
+    def test_body_must_be_an_object(self):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        for body in ([], 'x', [{'op': 'delete', 'id': self.doomed.pk}]):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    reverse('post-bulk'), json.dumps(body), content_type='application/json',
+                    HTTP_AUTHORIZATION=f'Bearer {token}'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('operations', response.json()['message'])
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_non_atomic_batch_applies_the_valid_operations(self):
+        response = self.post_bulk(
+            [{'op': 'delete', 'id': self.foreign.pk}, {'op': 'delete', 'id': self.doomed.pk}], atomic=False
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual([result['status'] for result in response.json()['data']], [403, 204])
+        self.assertFalse(Post.objects.filter(pk=self.doomed.pk).exists())
+
+
+class SparseFieldsetTests(TestCase):
+    """Post lists send stored excerpts and ?fields= trims responses and queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'password')
+        cls.post = Post.objects.create(title='Long read', content='word ' * 100, author=cls.user)
+
+    def get(self, path, **params):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        return self.client.get(path, params, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_excerpt_is_stored_on_save(self):
+        self.assertLessEqual(len(self.post.excerpt), 200)
+        self.assertTrue(self.post.excerpt.endswith('word\u2026'))
+        self.post.content = 'Short   now'
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.excerpt, 'Short now')
+
+    def test_list_sends_the_excerpt_without_reading_content(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(reverse('post-list'))
+        item = response.json()['data'][0]
+        self.assertEqual(set(item), {'id', 'title', 'excerpt', 'date_posted', 'author'})
+        post_queries = [query['sql'] for query in queries if 'FROM "blog_post"' in query['sql']]
+        self.assertTrue(post_queries)
+        self.assertFalse(any('"blog_post"."content"' in sql for sql in post_queries))
+
+    def test_fields_parameter_selects_fields(self):
+        response = self.get(reverse('post-list'), fields='id,title')
+        self.assertEqual(set(response.json()['data'][0]), {'id', 'title'})
+        response = self.get(reverse('post-list'), fields='title,content')
+        self.assertEqual(response.json()['data'][0]['content'], self.post.content)
+
+        detail = f'/api/v1/posts/{self.post.pk}/'
+        full = self.get(detail)
+        sparse = self.get(detail, fields='title')
+        self.assertEqual(sparse.json()['data'], {'title': 'Long read'})
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get(reverse('post-list'), fields='title,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['message'])
+
+
+class PostRenderingTests(TestCase):
+    """The values-row list path and FastJSONRenderer match the model serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('renderer', 'renderer@example.com', 'password')
+        cls.post = Post.objects.create(title='Caf\u00e9 \u2013 <b>', content='Body \u2603 ' * 50, author=cls.user)
+
+    def get(self, path, **params):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        return self.client.get(path, params, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_list_matches_the_model_serializer(self):
+        response = self.get(reverse('post-list'))
+        self.assertEqual(response.json()['data'], [PostListSerializer(self.post).data])
+        self.assertTrue(response.json()['data'][0]['date_posted'].endswith('Z'))
+
+        response = self.get(reverse('post-list'), stream='ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [PostSerializer(self.post).data])
+
+    def test_renderer_output_matches_json_renderer(self):
+        data = {'data': [PostSerializer(self.post).data], 'page': None, 'ok': True}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursors walk (date_posted, id) pages and reject anything they did not encode"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pager', 'pager@example.com', 'password')
+        Post.objects.bulk_create([
+            Post(title=f'Post {i}', content='Body', author=cls.user, date_posted=cls.date(i // 3))
+            for i in range(7)
+        ])
+
+    @staticmethod
+    def date(day):
+        return timezone.make_aware(datetime(2024, 1, 1 + day))
+
+    def paginator(self):
+        return KeysetPaginator(Post.objects.all(), 2)
+
+    def test_cursors_walk_every_post_once_in_order(self):
+        paginator = self.paginator()
+        page = paginator.page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        expected = list(Post.objects.order_by('-date_posted', '-id'))
+        # Three posts share each date: id breaks the ties
+        self.assertEqual(seen, expected)
+
+        previous = paginator.page(page.previous_cursor)
+        self.assertEqual(list(previous), expected[-3:-1])
+        self.assertTrue(previous.has_next())
+
+    def test_tampered_cursors_are_rejected(self):
+        valid = self.paginator().page().next_cursor
+        cursors = [
+            'garbage!',
+            valid[:-4],
+            encode_cursor([None, 1]),
+            encode_cursor(['2024-01-01T00:00:00+00:00', None]),
+            encode_cursor([['2024'], {'id': 1}]),
+            encode_cursor([True, 1]),
+            encode_cursor(['not a date', 1]),
+            encode_cursor(['2024-01-01T00:00:00+00:00']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator().page(cursor)
+
+    def test_api_answers_a_null_cursor_with_not_found(self):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        response = self.client.get(
+            reverse('post-list'), {'cursor': encode_cursor([None, None])}, HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PostSearchTests(TestCase):
+    """Ranked full-text search through the index, the search page and ?search="""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher', 'searcher@example.com', 'password')
+        cls.title_match = Post.objects.create(title='Pottery for beginners', content='Clay and wheels', author=cls.user)
+        cls.both_match = Post.objects.create(title='Pottery glazes', content='Pottery pottery glaze', author=cls.user)
+        cls.body_match = Post.objects.create(title='Weekend', content='Tried some pottery', author=cls.user)
+        cls.unrelated = Post.objects.create(title='Gardening', content='Tomatoes', author=cls.user)
+
+    def setUp(self):
+        # Article fragments are cached by post id, which test rollbacks reuse
+        page_cache.clear()
+
+    def search(self, query):
+        return list(search_posts(query, Post.objects.all()).order_by(*RANKED_ORDERING))
+
+    def test_title_matches_rank_first(self):
+        results = self.search('pottery')
+        self.assertEqual(results, [self.both_match, self.title_match, self.body_match])
+        ranks = [post.search_rank for post in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertEqual(self.search('   '), [])
+
+    def test_rank_cursor_pages_through_results(self):
+        paginator = KeysetPaginator(search_posts('pottery', Post.objects.all()), 2, ordering=RANKED_ORDERING)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(first) + list(second), self.search('pottery'))
+        self.assertFalse(second.has_next())
+
+        for value in ['high', float('inf'), True]:
+            with self.subTest(value=value), self.assertRaises(InvalidCursor):
+                paginator.page(encode_cursor([value, self.body_match.pk]))
+
+    def test_search_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post-search'), {'q': 'pottery'})
+        self.assertEqual(list(response.context['posts']), self.search('pottery'))
+        self.assertContains(response, 'Pottery glazes')
+        self.assertNotContains(response, 'Gardening')
+
+        response = self.client.get(reverse('post-search'), {'q': 'pottery', 'cursor': encode_cursor(['high', 1])})
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_search_param(self):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        response = self.client.get(reverse('post-list'), {'search': 'pottery', 'page_size': 2}, **headers)
+        body = response.json()
+        ids = [item['id'] for item in body['data']]
+
+        cursor = parse_qs(urlsplit(body['next']).query)['cursor'][0]
+        response = self.client.get(
+            reverse('post-list'), {'search': 'pottery', 'page_size': 2, 'cursor': cursor}, **headers
+        )
+        ids += [item['id'] for item in response.json()['data']]
+        self.assertEqual(ids, [post.pk for post in self.search('pottery')])
+
+    def test_index_follows_post_save_and_delete(self):
+        self.unrelated.content = 'Tomatoes in pottery planters'
+        self.unrelated.save()
+        self.assertIn(self.unrelated, self.search('pottery'))
+
+        self.title_match.title = 'Ceramics for beginners'
+        self.title_match.save()
+        self.assertNotIn(self.title_match, self.search('pottery'))
+
+        self.body_match.delete()
+        self.assertEqual(self.search('tried'), [])
+
+
+class PostCursorPaginationTests(TestCase):
+    """The API paginator caps ?page_size= and links pages with cursors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('lister', 'lister@example.com', 'password')
+        Post.objects.bulk_create([Post(title=f'Post {i}', content='Body', author=user) for i in range(105)])
+
+    def paginate(self, **params):
+        request = Request(APIRequestFactory().get('/api/v1/posts/', params))
+        paginator = PostCursorPagination()
+        page = paginator.paginate_queryset(Post.objects.all(), request)
+        return paginator, page
+
+    def test_page_size_is_capped(self):
+        _, page = self.paginate(page_size=500)
+        self.assertEqual(len(page), PostCursorPagination.max_page_size)
+        for page_size in ('0', 'many'):
+            _, page = self.paginate(page_size=page_size)
+            self.assertEqual(len(page), PostCursorPagination.page_size)
+
+    def test_envelope_links_the_pages(self):
+        paginator, page = self.paginate(page_size=100)
+        data = paginator.get_paginated_response([post.pk for post in page]).data
+        self.assertEqual(list(data), ['next', 'previous', 'results'])
+        self.assertIsNone(data['previous'])
+        self.assertIn('page_size=100', data['next'])
+
+        cursor = parse_qs(urlsplit(data['next']).query)['cursor'][0]
+        paginator, page = self.paginate(page_size=100, cursor=cursor)
+        data = paginator.get_paginated_response([post.pk for post in page]).data
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
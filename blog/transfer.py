@@ -0,0 +1,109 @@
+"""
+Streaming import and export of posts as JSONL or CSV.
+
+Both directions work a batch at a time: export iterates the table with a
+chunked cursor and writes each row as it arrives, import reads rows lazily
+and hands them to bench.factories.save_posts, which bulk inserts them. Neither
+holds more than one batch in memory, whatever the size of the table or file.
+
+A row has the fields in FIELDS; ``author`` is a username. Imports ignore
+``id`` and ``updated_at``, and ``date_posted`` defaults to the import time.
+"""
+import csv
+import json
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Post
+
+FIELDS = ('id', 'title', 'content', 'date_posted', 'updated_at', 'author')
+FORMATS = ('jsonl', 'csv')
+TITLE_MAX_LENGTH = Post._meta.get_field('title').max_length
+
+
+class InvalidRow(ValueError):
+    """Raised for an import row that cannot become a post"""
+
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def guess_format(path):
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(f, format):
+    """Yield (line number, row dict) from a JSONL or CSV file"""
+    if format == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            raise InvalidRow(number, f'invalid JSON ({e})')
+
+
+def parse_date(line, value, default):
+    if not value:
+        return default
+    date = parse_datetime(value)
+    if date is None:
+        raise InvalidRow(line, f'invalid date_posted {value!r}')
+    return date if timezone.is_aware(date) else timezone.make_aware(date)
+
+
+def build_post(line, row, author_ids, now):
+    """Unsaved Post from an import row; author_ids maps usernames to ids"""
+    title = (row.get('title') or '').strip()
+    content = row.get('content') or ''
+    if not title or not content:
+        raise InvalidRow(line, 'title and content are required')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise InvalidRow(line, f'title is longer than {TITLE_MAX_LENGTH} characters')
+    author_id = author_ids.get(row.get('author'))
+    if author_id is None:
+        raise InvalidRow(line, f'unknown author {row.get("author")!r}')
+    return Post(
+        title=title,
+        content=content,
+        author_id=author_id,
+        date_posted=parse_date(line, row.get('date_posted'), now),
+    )
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Row dicts of the posts in the queryset, read a chunk at a time"""
+    values = queryset.order_by('pk').values_list(
+        'pk', 'title', 'content', 'date_posted', 'updated_at', 'author__username'
+    )
+    for pk, title, content, date_posted, updated_at, author in values.iterator(chunk_size=chunk_size):
+        yield {
+            'id': pk,
+            'title': title,
+            'content': content,
+            'date_posted': date_posted.isoformat(),
+            'updated_at': updated_at.isoformat(),
+            'author': author,
+        }
+
+
+def write_rows(f, rows, format):
+    """Write row dicts to a file as they come; returns how many were written"""
+    written = 0
+    if format == 'csv':
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        return written
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False))
+        f.write('\n')
+        written += 1
+    return written
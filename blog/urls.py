@@ -7,7 +7,8 @@ from .views import (
     PostCreateView,
     PostUpdateView,
     PostDeleteView,
-    UserPostListView
+    UserPostListView,
+    PostSearchView
 )
 from . import views
 
@@ -20,6 +21,7 @@ main_urlpatterns = [
     path('', views.landing_page, name='landing-page'),
     path('home/', PostListView.as_view(), name='blog-home'),
     path('user/<str:username>/', UserPostListView.as_view(), name='user-posts'),
+    path('search/', PostSearchView.as_view(), name='post-search'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('post/new/', PostCreateView.as_view(), name='post-create'),
     path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post-update'),
@@ -9,8 +9,13 @@ from django.views.generic import (
     DeleteView
 )
 from .models import Post
+from .pagination import KeysetPaginationMixin
+from . import conditional, feed_cache
+from .search import RANKED_ORDERING, search_posts
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
+from django.template.loader import render_to_string
 from users.rate_limiting import post_creation_rate_limit
 
 def landing_page(request):
@@ -29,31 +34,107 @@ def terms(request):
 def privacy(request):
     return render(request, 'blog/privacy.html', {'title': 'Privacy Policy'})
 
-def home(request):
-    context = {
-        'posts': Post.objects.all()
-    }
-    return render(request, 'blog/home.html', context)
+class CachedFeedMixin:
+    """Serve the rendered post loop of a list view from the pages cache"""
+    feed_cache_name = None
+    feed_template_name = 'blog/includes/post_feed.html'
+    
+    def get_feed_cache_parts(self):
+        return [self.request.GET.get(self.cursor_kwarg, '')]
+    
+    def get(self, request, *args, **kwargs):
+        key = feed_cache.page_key(self.feed_cache_name, *self.get_feed_cache_parts())
+        entry = feed_cache.get_page(key)
+        cache_status = 'HIT' if entry is not None else 'MISS'
+        
+        if entry is None:
+            self.object_list = self.get_queryset()
+            context = self.get_context_data(feed_cache_timeout=feed_cache.PAGE_TIMEOUT)
+            entry = feed_cache.set_page(key, render_to_string(self.feed_template_name, context, request))
+        
+        # The key changes with the feed generation; the page chrome varies per user.
+        # No Last-Modified: a date can't tell one viewer's page from another's
+        etag = conditional.make_etag(key, request.user.pk)
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            # Built directly: on a hit there is no object_list for get_template_names()
+            response = self.response_class(
+                request=request,
+                template=[self.template_name],
+                context={'view': self, 'feed_html': mark_safe(entry['html'])},
+                using=self.template_engine,
+            )
+            conditional.set_validators(response, etag)
+        response['X-Feed-Cache'] = cache_status
+        return response
 
-class PostListView(ListView):
+class PostListView(CachedFeedMixin, KeysetPaginationMixin, ListView):
     model = Post
+    queryset = Post.objects.for_feed()
     template_name = 'blog/home.html' # <app>/<model>_<viewtype>.html
     context_object_name = 'posts'
-    ordering = ['-date_posted']
+    ordering = ['-date_posted', '-id']
     paginate_by = 5
+    feed_cache_name = 'home'
     
-class UserPostListView(ListView):
+class UserPostListView(CachedFeedMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/user_posts.html' # <app>/<model>_<viewtype>.html
     context_object_name = 'posts'
     paginate_by = 5
+    feed_cache_name = 'user'
+    feed_template_name = 'blog/includes/user_feed.html'
+    
+    def get_feed_cache_parts(self):
+        return [self.kwargs.get('username')] + super().get_feed_cache_parts()
     
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.kwargs.get('username'))
-        return Post.objects.filter(author=user).order_by('-date_posted')
+        self.author = get_object_or_404(User, username=self.kwargs.get('username'))
+        return Post.objects.for_feed().filter(author=self.author).order_by('-date_posted', '-id')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Served by the (author, date_posted) index
+        context['post_count'] = Post.objects.filter(author=self.author).count()
+        return context
+    
+class PostSearchView(KeysetPaginationMixin, ListView):
+    model = Post
+    template_name = 'blog/search.html'
+    context_object_name = 'posts'
+    paginate_by = 5
+    keyset_ordering = RANKED_ORDERING
+    max_query_length = 200
+    
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()[:self.max_query_length]
+    
+    def get_queryset(self):
+        return search_posts(self.get_search_query(), Post.objects.for_feed())
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.get_search_query()
+        context['feed_cache_timeout'] = feed_cache.PAGE_TIMEOUT
+        context['title'] = 'Search'
+        return context
     
 class PostDetailView(DetailView):
     model = Post
+    queryset = Post.objects.for_feed()
+    
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        # Update/Delete buttons depend on the viewer, so the ETag does too and
+        # Last-Modified (the same for every viewer) is left off
+        etag, _ = conditional.post_validators(self.object, request.user.pk)
+        response = conditional.not_modified(request, etag)
+        if response is not None:
+            return response
+        
+        context = self.get_context_data(object=self.object)
+        response = self.render_to_response(context)
+        return conditional.set_validators(response, etag)
     
 @method_decorator(post_creation_rate_limit(), name='dispatch')    
 class PostCreateView(LoginRequiredMixin, CreateView):
@@ -0,0 +1,50 @@
+"""
+Shared cache tiers.
+
+Project code goes through these helpers rather than ``django.core.cache.cache``
+so each kind of cached state lands in its own alias (see CACHES in settings)
+and keys are built the same way everywhere.
+"""
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from .perfstats import record_cache_lookup
+
+DEFAULT = 'default'
+RATELIMIT = 'ratelimit'
+PAGES = 'pages'
+
+_MISSING = object()
+
+
+class CacheProxy(ConnectionProxy):
+    """
+    Lazy, thread-safe proxy in the style of django.core.cache.cache that
+    reports hits and misses to the request being sampled (see perfstats)
+    """
+
+    def get(self, key, default=None, version=None):
+        value = self._connections[self._alias].get(key, _MISSING, version=version)
+        hit = value is not _MISSING
+        record_cache_lookup(hit, not hit)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._connections[self._alias].get_many(keys, version=version)
+        record_cache_lookup(len(values), len(keys) - len(values))
+        return values
+
+
+default_cache = CacheProxy(caches, DEFAULT)
+ratelimit_cache = CacheProxy(caches, RATELIMIT)
+page_cache = CacheProxy(caches, PAGES)
+
+
+def get_cache(alias=DEFAULT):
+    """Return the cache for an alias"""
+    return caches[alias]
+
+
+def make_key(*parts):
+    """Build a key such as ``feed:page:3`` (the backend adds prefix and version)"""
+    return ':'.join(str(part) for part in parts)
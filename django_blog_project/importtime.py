@@ -0,0 +1,76 @@
+"""
+Import-time profiling.
+
+Runs a fresh interpreter with ``-X importtime`` so the numbers describe a cold
+worker boot rather than the already-warm process asking for them. Used by
+``manage.py startup_profile``; the import budget test only looks at which
+modules a cold start loads, which does not depend on the machine's speed.
+"""
+from collections import namedtuple
+import os
+import subprocess
+import sys
+
+# What a web worker does before serving its first request
+COLD_START = (
+    'import django; django.setup(); '
+    'from django.conf import settings; __import__(settings.ROOT_URLCONF)'
+)
+
+# Dependencies only some requests need; they must be imported on first use
+HEAVY_MODULES = ('boto3', 'botocore', 'storages.backends.s3', 'PIL', 'pyotp', 'qrcode')
+
+ImportTime = namedtuple('ImportTime', 'module self_us cumulative_us depth')
+
+
+def _run(args, settings_module=None, environ=None):
+    """Run a new interpreter with this one's path and the given (or current) settings"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path), **(environ or {}))
+    if settings_module:
+        env['DJANGO_SETTINGS_MODULE'] = settings_module
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'django_blog_project.settings')
+    result = subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True)
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('Cold start failed:\n' + '\n'.join(errors[-20:]))
+    return result
+
+
+def loaded_modules(code=COLD_START, settings_module=None, environ=None):
+    """Names of every module in sys.modules after running `code` in a new interpreter"""
+    result = _run(['-c', f'{code}\nimport sys; print("\\n".join(sys.modules))'], settings_module, environ)
+    return set(result.stdout.split())
+
+
+def profile_imports(code=COLD_START, settings_module=None):
+    """Import times of every module loaded by `code` in a new interpreter"""
+    result = _run(['-X', 'importtime', '-c', code], settings_module)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # Column header
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def total_ms(imports):
+    return sum(entry.self_us for entry in imports) / 1000
+
+
+def heavy_modules(modules):
+    """HEAVY_MODULES (or their submodules) among the given module names"""
+    return sorted({
+        module for module in modules
+        if any(module == heavy or module.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    })
+
+
+def heavy_imports(imports):
+    """HEAVY_MODULES (or their submodules) among profiled imports"""
+    return heavy_modules(entry.module for entry in imports)
@@ -1,86 +1,208 @@
+from functools import lru_cache
+import random
 from django.conf import settings
+from django.http import HttpResponseForbidden
+from django.shortcuts import redirect
+from django.urls import Resolver404, resolve
+from users.rate_limiting import get_client_ip, get_rate_limiter
+from . import perfstats
 import logging
 
 logger = logging.getLogger(__name__)
 
-class CORSMiddleware:
+# URL names anonymous users may open; everything else redirects to the landing page
+PUBLIC_URL_NAMES = frozenset({
+    'landing-page',
+    'login',
+    'register',
+    'password_reset',
+    'password_reset_done',
+    'password_reset_confirm',
+    'password_reset_complete',
+    'verify_email',
+    'email_verification_sent',
+    'social:begin',
+    'social:complete',
+    'api-token-auth',
+    'token_obtain_pair',
+    'token_refresh',
+    'token_verify',
+    'swagger',
+    'redoc',
+})
+
+# API views authenticate JWTs themselves (DRF) and refuse anonymous requests
+# with 401, so API requests carrying one are not redirected
+API_PREFIX = '/api/'
+API_TOKEN_PREFIXES = tuple(f'{header_type} ' for header_type in settings.SIMPLE_JWT['AUTH_HEADER_TYPES'])
+
+# Requests per method and client IP, per time window in seconds
+RATE_LIMITS = {
+    'POST': (50, 3600),
+    'GET': (200, 3600),
+}
+
+DEVELOPMENT_CSP = (
+    "default-src 'self' http: https:",
+    "img-src 'self' data: http: https: blob:",
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://code.jquery.com https://cdn.jsdelivr.net https://cdnjs.cloudflare.com http: https:",
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com http: https:",
+    "font-src 'self' https://cdnjs.cloudflare.com http: https:",
+    "connect-src 'self' http: https:",
+    "media-src 'self' https://s3.amazonaws.com http: https:",
+    "object-src 'none'",
+    "base-uri 'self'",
+)
+
+PRODUCTION_CSP = (
+    "default-src 'self'",
+    "img-src 'self' data: https://*.googleusercontent.com https://*.google.com https://s3.amazonaws.com",
+    "script-src 'self' 'unsafe-inline' https://code.jquery.com https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://accounts.google.com https://apis.google.com",
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://fonts.googleapis.com",
+    "font-src 'self' https://cdnjs.cloudflare.com https://fonts.gstatic.com",
+    "frame-src 'self' https://accounts.google.com",
+    "connect-src 'self' https://*.google.com https://accounts.google.com",
+    "media-src 'self' https://s3.amazonaws.com",
+    "object-src 'none'",
+    "base-uri 'self'",
+    "upgrade-insecure-requests",
+)
+
+
+def build_security_headers(debug):
+    """Security headers added to every response, computed once per process"""
+    headers = {
+        'X-Content-Type-Options': 'nosniff',
+        'X-Frame-Options': 'SAMEORIGIN',
+        'Referrer-Policy': 'strict-origin-when-cross-origin',
+        'Permissions-Policy': 'geolocation=self camera=self microphone=self interest-cohort=() payment=self',
+        'Content-Security-Policy': '; '.join(DEVELOPMENT_CSP if debug else PRODUCTION_CSP),
+    }
+    if not debug:
+        headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
+    return tuple(headers.items())
+
+
+@lru_cache(maxsize=2048)
+def resolve_url_name(urlconf, path):
+    """URL name of a path (None if it does not resolve), cached per URLconf"""
+    try:
+        match = resolve(path, urlconf)
+    except Resolver404:
+        return None
+    return match.view_name if match.namespace else match.url_name
+
+
+def carries_api_token(request):
+    """An API request with a JWT for DRF to authenticate (or refuse)"""
+    return (
+        request.path.startswith(API_PREFIX)
+        and request.META.get('HTTP_AUTHORIZATION', '').startswith(API_TOKEN_PREFIXES)
+    )
+
+
+class EdgeMiddleware:
+    """
+    The project's own request pipeline, run in order and stopping at the
+    first step that answers:
+      1. static/media files are served without access or rate checks
+      2. admin is staff only; anonymous users only reach PUBLIC_URL_NAMES,
+         or the API with a bearer token
+      3. per-IP rate limits for non-staff users
+    Every response, including short-circuited ones, gets the security headers.
+    CORS is left to corsheaders.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.security_headers = build_security_headers(settings.DEBUG)
+        # Remote (CDN) static/media URLs never reach Django
+        self.file_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL)
+            if prefix and prefix.startswith('/')
+        )
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Development settings
-        if settings.DEBUG:
-            response["Access-Control-Allow-Credentials"] = "true"
-            response["Access-Control-Allow-Origin"] = request.headers.get("Origin", "")
-            response["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-            response["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-CSRFToken"
-            response["Access-Control-Max-Age"] = "3600"
+        if request.path.startswith(self.file_prefixes):
+            response = self.get_response(request)
         else:
-            # Production settings remain unchanged
-            origin = request.headers.get("Origin", "")
-            allowed_origins = ["https://echoe5.com", "https://www.echoe5.com"]
-            
-            if origin in allowed_origins:
-                response["Access-Control-Allow-Credentials"] = "true"
-                response["Access-Control-Allow-Origin"] = origin
-                response["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-                response["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-CSRFToken"
-                response["Access-Control-Max-Age"] = "3600"
-                
-                logger.info(f"CORS headers set for origin: {origin}")
+            response = self.check_access(request) or self.check_rate_limit(request) or self.get_response(request)
 
+        for name, value in self.security_headers:
+            response[name] = value
         return response
 
-class SecurityHeadersMiddleware:
+    def check_access(self, request):
+        """Redirect requests the user may not make; None to carry on"""
+        user = request.user
+        if request.path.startswith('/admin/'):
+            if not user.is_authenticated:
+                logger.warning(f"Unauthenticated user attempted to access admin: {request.path}")
+                return redirect('landing-page')
+            if not user.is_staff:
+                logger.warning(
+                    f"Authenticated non-staff user attempted to access admin: {user.username}"
+                )
+                return redirect('blog-home')  # Redirect authenticated non-staff to home
+            return None
+
+        if not user.is_authenticated:
+            if carries_api_token(request):
+                return None
+            # Only anonymous requests need the URL name
+            if resolve_url_name(settings.ROOT_URLCONF, request.path_info) not in PUBLIC_URL_NAMES:
+                logger.info(
+                    f"Redirecting unauthenticated user from {request.path} to landing page"
+                )
+                return redirect('landing-page')
+        return None
+
+    def check_rate_limit(self, request):
+        """Forbid clients over their per-method limit; None to carry on"""
+        limits = RATE_LIMITS.get(request.method)
+        if limits is None or request.user.is_staff:  # Staff bypass rate limiting
+            return None
+
+        ip = get_client_ip(request)
+        result = get_rate_limiter().hit(f'rate_limit:{ip}:{request.method}', *limits)
+        if not result.allowed:
+            logger.warning(f'Rate limit exceeded for IP: {ip}, Method: {request.method}')
+            return HttpResponseForbidden('Rate limit exceeded. Please try again later.')
+        return None
+
+
+class PerformanceMiddleware:
+    """
+    Samples requests for perfstats: time, queries, SQL time, render time,
+    cache hits/misses and response size per view. Goes first in MIDDLEWARE
+    so the time covers the whole stack.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Base security headers
-        response['X-Content-Type-Options'] = 'nosniff'
-        response['X-Frame-Options'] = 'SAMEORIGIN'
-        response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        response['Permissions-Policy'] = 'geolocation=self camera=self microphone=self interest-cohort=() payment=self'
-
-        # Development vs Production CSP handling
-        if settings.DEBUG:
-            csp_directives = [
-                "default-src 'self' http: https:",
-                "img-src 'self' data: http: https: blob:",
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://code.jquery.com https://cdn.jsdelivr.net https://cdnjs.cloudflare.com http: https:",
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com http: https:",
-                "font-src 'self' https://cdnjs.cloudflare.com http: https:",
-                "connect-src 'self' http: https:",
-                "media-src 'self' https://s3.amazonaws.com http: https:",
-                "object-src 'none'",
-                "base-uri 'self'"
-            ]
-        else:
-            # Production CSP directives remain unchanged
-            csp_directives = [
-                "default-src 'self'",
-                "img-src 'self' data: https://*.googleusercontent.com https://*.google.com https://s3.amazonaws.com",
-                "script-src 'self' 'unsafe-inline' https://code.jquery.com https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://accounts.google.com https://apis.google.com",
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://fonts.googleapis.com",
-                "font-src 'self' https://cdnjs.cloudflare.com https://fonts.gstatic.com",
-                "frame-src 'self' https://accounts.google.com",
-                "connect-src 'self' https://*.google.com https://accounts.google.com",
-                "media-src 'self' https://s3.amazonaws.com",
-                "object-src 'none'",
-                "base-uri 'self'"
-            ]
-            
-            # Add HSTS and upgrade-insecure-requests in production
-            response['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
-            csp_directives.append("upgrade-insecure-requests")
-            
-            logger.info(
-                f"Applied security headers for {request.path}. CSP directives: {'; '.join(csp_directives)}"
-            )
-        
-        response['Content-Security-Policy'] = "; ".join(csp_directives)
-        return response
\ No newline at end of file
+        sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+        if not sample_rate or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        response, metrics, elapsed_ns = perfstats.measure(self.get_response, request)
+        match = request.resolver_match
+        # Requests answered before URL resolution (e.g. redirected to the
+        # landing page) are grouped by status
+        view = f'{request.method} {match.view_name if match else f"[{response.status_code}]"}'
+        size = 0 if response.streaming else len(response.content)
+        perfstats.record(view, metrics, elapsed_ns, size)
+
+        if getattr(settings, 'PERF_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing(elapsed_ns)
+        return response
+
+    def process_template_response(self, request, response):
+        # TemplateResponse and DRF responses render after every middleware
+        # has seen them, so time the render through a post-render callback
+        metrics = perfstats.current_metrics()
+        if metrics is not None:
+            metrics.start_render()
+            response.add_post_render_callback(metrics.end_render)
+        return response
@@ -0,0 +1,223 @@
+"""
+Request performance statistics.
+
+PerformanceMiddleware samples PERF_SAMPLE_RATE of requests and measures per
+view: wall time, query count and SQL time (through a connection
+execute_wrapper), render time of TemplateResponse and DRF responses, cache
+hits and misses through the project cache proxies, and response size.
+Function views that call render() themselves count their rendering as view
+time. With PERF_SERVER_TIMING the figures are also sent as a Server-Timing
+header.
+
+Samples are added to in-process, fixed-bucket histograms, so recording one is
+a few additions under a lock. Every PERF_FLUSH_INTERVAL seconds a process
+publishes its totals to the default cache, where ``manage.py perfstats``
+merges the totals of every worker. Resetting bumps a generation number;
+workers drop their totals when they see it change.
+"""
+from contextlib import ExitStack
+from contextvars import ContextVar
+import os
+import socket
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+# The cache module reports lookups here, so refer to it lazily
+from . import cache
+
+# Upper bounds of the latency buckets in milliseconds; one more bucket
+# counts everything slower
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SNAPSHOT_TIMEOUT = 24 * 3600
+COUNTERS = ('count', 'time_ms', 'queries', 'sql_ms', 'render_ms', 'cache_hits', 'cache_misses', 'bytes')
+
+_current = ContextVar('perf_metrics', default=None)
+_stats = {}
+_stats_lock = threading.Lock()
+_generation = None
+_last_publish = time.monotonic()
+
+
+class RequestMetrics:
+    """Counters of one sampled request"""
+    __slots__ = ('queries', 'sql_ns', 'render_ns', 'render_start', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = self.sql_ns = self.render_ns = self.render_start = 0
+        self.cache_hits = self.cache_misses = 0
+
+    def start_render(self):
+        self.render_start = time.perf_counter_ns()
+
+    def end_render(self, response):
+        # A post-render callback; returning None keeps the response
+        self.render_ns += time.perf_counter_ns() - self.render_start
+
+    def server_timing(self, total_ns):
+        return (
+            f'total;dur={total_ns / 1e6:.1f}, '
+            f'db;dur={self.sql_ns / 1e6:.1f};desc="{self.queries} queries", '
+            f'render;dur={self.render_ns / 1e6:.1f}, '
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"'
+        )
+
+
+def current_metrics():
+    """Metrics of the request being sampled in this context, or None"""
+    return _current.get()
+
+
+def record_cache_lookup(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.sql_ns += time.perf_counter_ns() - start
+
+
+def measure(get_response, request):
+    """Run a request with metrics collection; returns (response, metrics, elapsed ns)"""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    start = time.perf_counter_ns()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_count_query))
+            response = get_response(request)
+    finally:
+        _current.reset(token)
+    return response, metrics, time.perf_counter_ns() - start
+
+
+def _new_entry():
+    entry = dict.fromkeys(COUNTERS, 0)
+    entry['buckets'] = [0] * (len(BUCKETS_MS) + 1)
+    return entry
+
+
+def _bucket(elapsed_ms):
+    for index, bound in enumerate(BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(BUCKETS_MS)
+
+
+def record(view, metrics, elapsed_ns, size):
+    """Add one sampled request to the in-process totals"""
+    global _last_publish
+    elapsed_ms = elapsed_ns / 1e6
+    with _stats_lock:
+        entry = _stats.get(view)
+        if entry is None:
+            entry = _stats[view] = _new_entry()
+        entry['count'] += 1
+        entry['time_ms'] += elapsed_ms
+        entry['queries'] += metrics.queries
+        entry['sql_ms'] += metrics.sql_ns / 1e6
+        entry['render_ms'] += metrics.render_ns / 1e6
+        entry['cache_hits'] += metrics.cache_hits
+        entry['cache_misses'] += metrics.cache_misses
+        entry['bytes'] += size
+        entry['buckets'][_bucket(elapsed_ms)] += 1
+
+        now = time.monotonic()
+        due = now - _last_publish >= getattr(settings, 'PERF_FLUSH_INTERVAL', 30)
+        if due:
+            _last_publish = now
+    if due:
+        publish()
+
+
+def _process_id():
+    # Looked up on every publish: pre-forking servers import before forking
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _generation_key():
+    return cache.make_key('perf', 'generation')
+
+
+def _registry_key():
+    return cache.make_key('perf', 'processes')
+
+
+def _snapshot_key(process_id):
+    return cache.make_key('perf', 'process', process_id)
+
+
+def publish():
+    """Store this process's totals in the shared cache"""
+    global _generation
+    generation = cache.default_cache.get(_generation_key(), 0)
+    with _stats_lock:
+        if generation != _generation:
+            # Reset since the last publish (or first publish)
+            if _generation is not None:
+                _stats.clear()
+            _generation = generation
+        views = {view: dict(entry, buckets=list(entry['buckets'])) for view, entry in _stats.items()}
+
+    process_id = _process_id()
+    cache.default_cache.set(
+        _snapshot_key(process_id),
+        {'generation': generation, 'published': time.time(), 'views': views},
+        SNAPSHOT_TIMEOUT
+    )
+    # Read-modify-write; a registration lost to a race is redone next publish
+    processes = cache.default_cache.get(_registry_key()) or {}
+    if process_id not in processes:
+        processes[process_id] = time.time()
+        cache.default_cache.set(_registry_key(), processes, SNAPSHOT_TIMEOUT)
+
+
+def collect():
+    """Merged totals of every process published in the current generation"""
+    generation = cache.default_cache.get(_generation_key(), 0)
+    processes = cache.default_cache.get(_registry_key()) or {}
+    snapshots = cache.default_cache.get_many([_snapshot_key(process_id) for process_id in processes])
+    merged = {}
+    for snapshot in snapshots.values():
+        if snapshot['generation'] != generation:
+            continue
+        for view, entry in snapshot['views'].items():
+            total = merged.setdefault(view, _new_entry())
+            for counter in COUNTERS:
+                total[counter] += entry[counter]
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+    return merged, len(snapshots)
+
+
+def reset():
+    """Start a new generation; workers drop their totals on their next publish"""
+    global _generation
+    generation = cache.default_cache.get(_generation_key(), 0) + 1
+    cache.default_cache.set(_generation_key(), generation, None)
+    cache.default_cache.delete(_registry_key())
+    # This process drops its own now: after a cache flush generations repeat
+    with _stats_lock:
+        _stats.clear()
+        _generation = generation
+    return generation
+
+
+def percentile(buckets, fraction):
+    """Upper bound in ms of the bucket holding the given fraction of requests"""
+    threshold = sum(buckets) * fraction
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if count and seen >= threshold:
+            return BUCKETS_MS[index] if index < len(BUCKETS_MS) else float('inf')
+    return None
@@ -7,10 +7,9 @@ from datetime import timedelta
 import os
 import sys
 import environ
-from storages.backends.s3boto3 import S3Boto3Storage
-import boto3
 import logging
 import django
+from django.core.exceptions import ImproperlyConfigured
 
 # Django version
 DJANGO_VERSION = django.get_version()
@@ -89,7 +88,6 @@ INSTALLED_APPS = [
 # Rest Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
         'users.authentication.CustomJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -107,8 +105,10 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'blog.api.renderers.FastJSONRenderer',
+        # The browsable API is a development aid; it also renders a full
+        # HTML page whenever a browser asks
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -116,16 +116,15 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'django_blog_project.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'django_blog_project.middleware.CORSMiddleware',
-    'django_blog_project.middleware.SecurityHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'users.middleware.AuthenticationMiddleware',
-    'users.middleware.RateLimitMiddleware',
+    # Access control, rate limiting and security headers
+    'django_blog_project.middleware.EdgeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
@@ -401,12 +400,86 @@ else:
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/'
 
 # Cache configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# Each alias must be shared by all workers so cached state and rate limits are
+# site-wide rather than per process:
+#   default   - general purpose (security state, API lookups)
+#   ratelimit - rate limiter and DRF throttle counters
+#   pages     - rendered pages and template fragments
+# CACHE_URL (or <ALIAS>_CACHE_URL) is required in production, e.g.
+# redis://127.0.0.1:6379/1. The rate limiter counts with incr(), so the
+# ratelimit alias must be a backend where it is atomic (not the database or
+# file cache). Tests and development use local stand-ins.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+NON_ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.db.DatabaseCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+CACHE_KEY_PREFIX = env('CACHE_KEY_PREFIX', default='echoe5-dev' if IS_DEVELOPMENT else 'echoe5')
+CACHE_VERSION = env.int('CACHE_VERSION', default=1)
+CACHE_TIMEOUTS = {
+    'default': 300,
+    'ratelimit': 7200,
+    'pages': 600,
 }
 
+CACHES = {}
+for _alias, _timeout in CACHE_TIMEOUTS.items():
+    if TESTING or (IS_DEVELOPMENT and _alias == 'ratelimit'):
+        # The development server is a single process, so locmem is shared enough
+        _fallback_url = f'locmemcache://{_alias}'
+    elif IS_DEVELOPMENT:
+        _fallback_url = f'filecache://{BASE_DIR / "cache" / _alias}'
+    else:
+        _fallback_url = None
+    _cache_url = env(f'{_alias.upper()}_CACHE_URL', default=env('CACHE_URL', default=_fallback_url))
+    if _cache_url is None:
+        raise ImproperlyConfigured(f'Set CACHE_URL or {_alias.upper()}_CACHE_URL, e.g. redis://127.0.0.1:6379/1')
+    CACHES[_alias] = env.cache_url_config(_cache_url)
+    CACHES[_alias].setdefault('KEY_PREFIX', f'{CACHE_KEY_PREFIX}:{_alias}')
+    CACHES[_alias].setdefault('VERSION', CACHE_VERSION)
+    CACHES[_alias].setdefault('TIMEOUT', _timeout)
+
+# Rate limiting engine and the cache alias holding its counters
+RATE_LIMIT_ENGINE = 'users.rate_limiting.SlidingWindowLimiter'
+RATE_LIMIT_CACHE = 'ratelimit'
+if CACHES[RATE_LIMIT_CACHE]['BACKEND'] in NON_ATOMIC_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f'The {RATE_LIMIT_CACHE} cache needs atomic incr(); use Redis or Memcached, '
+        f'not {CACHES[RATE_LIMIT_CACHE]["BACKEND"]}'
+    )
+
+# Count failed logins in the cache and write them to the database in batches
+# (users/login_failures.py). Off by default: every failure is one UPDATE.
+FAILED_LOGIN_BUFFER = env.bool('FAILED_LOGIN_BUFFER', default=False)
+FAILED_LOGIN_FLUSH_BATCH = 5
+
+# Background jobs (users/jobs.py). 'queue' leaves jobs in the database for
+# `manage.py process_image_jobs` workers; 'thread' runs them in a small
+# in-process pool, which is enough for development.
+IMAGE_JOB_BACKEND = env('IMAGE_JOB_BACKEND', default='thread' if IS_DEVELOPMENT else 'queue')
+IMAGE_JOB_THREADS = 2
+IMAGE_JOB_MAX_ATTEMPTS = 5
+
+# Outgoing mail is queued as OutboundEmail rows. 'queue' leaves it for
+# `manage.py send_queued_email`, which reuses one SMTP connection per batch;
+# 'thread' sends it from the job pool above.
+EMAIL_JOB_BACKEND = env('EMAIL_JOB_BACKEND', default=IMAGE_JOB_BACKEND)
+EMAIL_JOB_MAX_ATTEMPTS = 8
+
+# Import time allowed for a cold worker start, reported by `manage.py
+# startup_profile`. Heavy optional dependencies are imported on first use
+# (a test checks that a cold start does not load them).
+STARTUP_IMPORT_BUDGET_MS = 1500
+
+# Request instrumentation (django_blog_project/perfstats.py, `manage.py
+# perfstats`). The sample rate keeps it cheap enough to leave on in
+# production; Server-Timing headers expose internals, so they are dev only
+# by default.
+PERF_SAMPLE_RATE = env.float('PERF_SAMPLE_RATE', default=1.0 if IS_DEVELOPMENT else 0.05)
+PERF_SERVER_TIMING = env.bool('PERF_SERVER_TIMING', default=IS_DEVELOPMENT)
+PERF_FLUSH_INTERVAL = 30
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -421,8 +494,17 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
+    {
+        'NAME': 'users.password_policy.PasswordPolicyValidator',
+    },
 ]
 
+# Password/email policy data (users/password_policy.py). The breached
+# password file is built with `manage.py build_breached_passwords`; the check
+# is skipped while it is unset.
+BREACHED_PASSWORDS_FILE = env('BREACHED_PASSWORDS_FILE', default=None)
+DISPOSABLE_EMAIL_DOMAINS_FILE = env('DISPOSABLE_EMAIL_DOMAINS_FILE', default=None)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
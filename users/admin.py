@@ -1,5 +1,17 @@
 from django.contrib import admin
-from .models import Profile, UserSecurityProfile
+from .models import OutboundEmail, Profile, ProfileImageJob, UserSecurityProfile
 
 admin.site.register(Profile)
-admin.site.register(UserSecurityProfile)
\ No newline at end of file
+admin.site.register(UserSecurityProfile)
+
+@admin.register(ProfileImageJob)
+class ProfileImageJobAdmin(admin.ModelAdmin):
+    list_display = ('image_name', 'profile', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
@@ -1,13 +1,76 @@
+from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django_blog_project.cache import default_cache, make_key
+from .security_state import get_security_state
+from .token_blacklist import CachedRefreshToken
 import jwt
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns needed to authenticate and authorize an API request; anything else
+# on the returned User is deferred and loaded on first access
+AUTH_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+AUTH_USER_TIMEOUT = 60
+
+
+def _auth_user_key(user_id):
+    return make_key('auth', 'user', user_id)
+
+
+def get_auth_user(user_id):
+    """Minimal User for an id, cached briefly; None if it does not exist"""
+    User = get_user_model()
+    # from_db() expects the loaded fields in model order
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in AUTH_USER_FIELDS]
+    key = _auth_user_key(user_id)
+    values = default_cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values_list(*fields).first()
+        if values is None:
+            return None
+        default_cache.set(key, values, AUTH_USER_TIMEOUT)
+    return User.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+
+def invalidate_auth_user(user_id):
+    default_cache.delete(_auth_user_key(user_id))
+
+
 class CustomJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that decodes the token once and resolves the user
+    from a short-lived cache instead of querying auth_user per request.
+    Locked accounts are rejected using the cached security state.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached
+            user = super().get_user(validated_token)
+        else:
+            user = self.get_cached_user(validated_token)
+        if get_security_state(user.pk).is_locked():
+            raise AuthenticationFailed('Account is temporarily locked', code='user_locked')
+        return user
+
+    def get_cached_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user = get_auth_user(user_id)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
     def authenticate(self, request):
         try:
             header = self.get_header(request)
@@ -21,8 +84,7 @@ class CustomJWTAuthentication(JWTAuthentication):
             validated_token = self.get_validated_token(raw_token)
             user = self.get_user(validated_token)
             
-            # Log successful authentication
-            logger.info(f"JWT Authentication successful for user: {user.username}")
+            logger.debug(f"JWT Authentication successful for user: {user.username}")
             
             return user, validated_token
 
@@ -32,6 +94,9 @@ class CustomJWTAuthentication(JWTAuthentication):
         except TokenError as e:
             logger.warning(f"Token error: {str(e)}")
             raise
+        except AuthenticationFailed as e:
+            logger.warning(f"Authentication failed: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Unexpected authentication error: {str(e)}")
             raise
@@ -39,7 +104,7 @@ class CustomJWTAuthentication(JWTAuthentication):
 def generate_tokens_for_user(user):
     """Generate access and refresh tokens for a user"""
     try:
-        refresh = RefreshToken.for_user(user)
+        refresh = CachedRefreshToken.for_user(user)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -0,0 +1,85 @@
+"""
+Avatar derivatives.
+
+Every uploaded profile picture is cropped to squares of AVATAR_SIZES and
+stored as AVIF (when Pillow can encode it), WebP and a JPEG fallback. Names
+are derived from the source name, so re-processing overwrites the same files.
+Pillow is imported on first use, as templates only need the metadata here.
+The result is recorded on ``Profile.avatar_variants``:
+
+    {'source': 'profile_pics/me.png',
+     'formats': {'webp': {'64': 'avatars/1a2b.../64.webp', ...},
+                 'jpeg': {'64': 'avatars/1a2b.../64.jpg', ...}}}
+"""
+import hashlib
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+AVATAR_SIZES = (64, 128, 300)
+AVATAR_DIR = 'avatars'
+
+# format -> (file extension, MIME type, save options); best format first
+AVATAR_FORMATS = {
+    'avif': ('avif', 'image/avif', {'quality': 60}),
+    'webp': ('webp', 'image/webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+FALLBACK_FORMAT = 'jpeg'
+
+
+def get_formats():
+    """Formats the installed Pillow can encode, best first"""
+    from PIL import Image
+    Image.init()
+    return [fmt for fmt in AVATAR_FORMATS if fmt.upper() in Image.SAVE]
+
+
+def variant_name(source_name, size, fmt):
+    """Deterministic storage name of one derivative"""
+    digest = hashlib.sha1(source_name.encode()).hexdigest()[:16]
+    return posixpath.join(AVATAR_DIR, digest, f'{size}.{AVATAR_FORMATS[fmt][0]}')
+
+
+def _encode(img, fmt):
+    if fmt == 'jpeg' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt.upper(), **AVATAR_FORMATS[fmt][2])
+    return buffer.getvalue()
+
+
+def generate_avatar_variants(source_name, storage=None):
+    """Write every size/format derivative of a picture and return the mapping"""
+    from PIL import Image, ImageOps
+    storage = storage or default_storage
+    formats = {fmt: {} for fmt in get_formats()}
+
+    with storage.open(source_name, 'rb') as source, Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+        edges = sorted({min(size, img.width, img.height) for size in AVATAR_SIZES})
+        for edge in edges:
+            # Never upscale: small uploads just get fewer distinct sizes, and
+            # each entry is keyed by its real width for srcset
+            square = ImageOps.fit(img, (edge, edge), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                name = variant_name(source_name, edge, fmt)
+                # Remote storages append a suffix instead of overwriting
+                if storage.exists(name):
+                    storage.delete(name)
+                formats[fmt][str(edge)] = storage.save(name, ContentFile(_encode(square, fmt)))
+
+    return {'source': source_name, 'formats': formats}
+
+
+def current_variants(profile):
+    """Recorded derivatives of the profile's current picture, or None"""
+    variants = profile.avatar_variants or {}
+    if variants.get('source') != profile.profile_picture.name:
+        return None
+    return variants.get('formats') or None
@@ -1,26 +1,19 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.utils import timezone
-from datetime import timedelta
+from .security_state import get_security_state
 
 def check_account_lockout(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if request.user.is_authenticated:
-            security_profile = request.user.usersecurityprofile
-            if security_profile.account_locked_until:
-                if timezone.now() < security_profile.account_locked_until:
-                    messages.error(
-                        request,
-                        'Account is temporarily locked. Please try again later.'
-                    )
-                    return redirect('login')
-                else:
-                    # Reset lockout if time has expired
-                    security_profile.account_locked_until = None
-                    security_profile.failed_login_attempts = 0
-                    security_profile.save()
+            # An expired lock reads as unlocked; it is cleared on the next login attempt
+            if get_security_state(request.user, request).is_locked():
+                messages.error(
+                    request,
+                    'Account is temporarily locked. Please try again later.'
+                )
+                return redirect('login')
         return view_func(request, *args, **kwargs)
     return wrapper
 
@@ -28,8 +21,7 @@ def require_2fa(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if request.user.is_authenticated:
-            security_profile = request.user.usersecurityprofile
-            if security_profile.two_factor_enabled:
+            if get_security_state(request.user, request).two_factor_enabled:
                 if not request.session.get('2fa_verified'):
                     return redirect('2fa-verify')
         return view_func(request, *args, **kwargs)
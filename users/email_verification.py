@@ -2,19 +2,30 @@ from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from django.utils.html import strip_tags
 from django.conf import settings
+from functools import lru_cache
+from .jobs import enqueue_email
 import logging
 
 logger = logging.getLogger(__name__)
 
+VERIFICATION_TEMPLATE = 'users/email/verification_email.html'
+
+
+@lru_cache(maxsize=None)
+def get_verification_template():
+    """Compile the verification template once per process"""
+    return get_template(VERIFICATION_TEMPLATE)
+
+
 class EmailVerifier:
     @staticmethod
     def send_verification_email(user, domain, uid, token):
         """
-        Send verification email to user
+        Queue the verification email for the mail worker; the message goes
+        out once the registration transaction commits
         """
         try:
             context = {
@@ -26,10 +37,7 @@ class EmailVerifier:
             }
             
             # Render email templates
-            html_content = render_to_string(
-                'users/email/verification_email.html',
-                context
-            )
+            html_content = get_verification_template().render(context)
             text_content = strip_tags(html_content)
             
             # Create email
@@ -37,22 +45,19 @@ class EmailVerifier:
             from_email = settings.EMAIL_HOST_USER
             to_email = user.email
             
-            # Create message with both HTML and plain text versions
-            msg = EmailMultiAlternatives(
+            # Queue message with both HTML and plain text versions
+            enqueue_email(
                 subject,
                 text_content,
-                from_email,
-                [to_email]
+                [to_email],
+                html_body=html_content,
+                from_email=from_email
             )
-            msg.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            msg.send()
-            logger.info(f"Verification email sent to {user.email}")
+            logger.info(f"Verification email queued for {user.email}")
             return True
             
         except Exception as e:
-            logger.error(f"Error sending verification email: {str(e)}")
+            logger.error(f"Error queueing verification email: {str(e)}")
             return False
 
     @staticmethod
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, PasswordChangeForm
 from django.core.exceptions import ValidationError
 from .models import Profile
-import re
+from .password_policy import check_email
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,52 +17,21 @@ class UserRegisterForm(UserCreationForm):
         fields = ['username', 'email', 'password1', 'password2']
     
     def clean_password1(self):
-        """Validate password complexity requirements"""
+        """Require a password; its strength is checked by the validators below"""
         password = self.cleaned_data.get('password1')
         
         if not password:
             raise ValidationError('Password is required.')
-            
-        # Length check
-        if len(password) < 12:
-            logger.warning("Password length requirement not met")
-            raise ValidationError('Password must be at least 12 characters long.')
-            
-        # Complexity requirements
-        if not re.search(r'[A-Z]', password):
-            logger.warning("Password uppercase requirement not met")
-            raise ValidationError('Password must contain at least one uppercase letter.')
-        if not re.search(r'[a-z]', password):
-            logger.warning("Password lowercase requirement not met")
-            raise ValidationError('Password must contain at least one lowercase letter.')
-        if not re.search(r'[0-9]', password):
-            logger.warning("Password number requirement not met")
-            raise ValidationError('Password must contain at least one number.')
-        if not re.search(r'[!@#$%^&*(),._?":{}|<>]', password):
-            logger.warning("Password special character requirement not met")
-            raise ValidationError('Password must contain at least one special character.')
-            
-        # Check for common patterns
-        common_patterns = [
-            r'\b(123|321|abc|cba|password|qwerty|admin)\b',
-        ]
-        
-        username = self.cleaned_data.get('username', '')
-        email = self.cleaned_data.get('email', '').split('@')[0] if self.cleaned_data.get('email') else ''
         
-        if username:
-            common_patterns.append(re.escape(username))
-        if email:
-            common_patterns.append(re.escape(email))
-        
-        for pattern in common_patterns:
-            if re.search(pattern, password.lower()):
-                logger.warning("Password contains common pattern or personal info")
-                raise ValidationError('Password contains common patterns or personal information.')
-        
-        logger.info("Password complexity validation successful")
         return password
 
+    def validate_password_for_user(self, user, **kwargs):
+        """
+        Run AUTH_PASSWORD_VALIDATORS, which include the password policy, once
+        against the user built from the form and report failures on password1
+        """
+        super().validate_password_for_user(user, password_field_name='password1')
+
     def clean_email(self):
         """Validate email uniqueness and format"""
         email = self.cleaned_data.get('email')
@@ -75,17 +44,8 @@ class UserRegisterForm(UserCreationForm):
             logger.warning(f"Registration attempt with existing email: {email}")
             raise ValidationError('This email is already registered.')
         
-        # Additional email validation
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-            logger.warning(f"Invalid email format attempt: {email}")
-            raise ValidationError('Please enter a valid email address.')
-        
-        # Check for disposable email providers
-        disposable_domains = ['tempmail.com', 'throwaway.com']  # Add more as needed
-        domain = email.split('@')[1]
-        if domain in disposable_domains:
-            logger.warning(f"Registration attempt with disposable email domain: {domain}")
-            raise ValidationError('Disposable email addresses are not allowed.')
+        # Format and disposable email providers
+        check_email(email)
         
         logger.info(f"Email validation successful for: {email}")
         return email
@@ -116,17 +76,8 @@ class UserUpdateForm(forms.ModelForm):
                 logger.warning(f"Update attempt with existing email: {email}")
                 raise ValidationError('This email is already registered.')
                 
-            # Additional email validation
-            if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-                logger.warning(f"Invalid email format in update: {email}")
-                raise ValidationError('Please enter a valid email address.')
-            
-            # Check for disposable email providers
-            disposable_domains = ['tempmail.com', 'throwaway.com']
-            domain = email.split('@')[1]
-            if domain in disposable_domains:
-                logger.warning(f"Update attempt with disposable email domain: {domain}")
-                raise ValidationError('Disposable email addresses are not allowed.')
+            # Format and disposable email providers
+            check_email(email)
         
         logger.info(f"Email update validation successful for: {email}")
         return email
@@ -0,0 +1,248 @@
+"""
+Background jobs.
+
+Jobs are rows of a ``QueuedJob`` model. Enqueueing happens inside the request
+and the work is done out of band by one of two backends (IMAGE_JOB_BACKEND,
+EMAIL_JOB_BACKEND):
+  - 'queue': rows wait for ``manage.py process_image_jobs`` /
+    ``send_queued_email`` workers, which claim them with
+    SELECT ... FOR UPDATE SKIP LOCKED
+  - 'thread': an in-process thread pool, convenient in development
+Failed jobs are retried with exponential backoff until max_attempts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .avatars import generate_avatar_variants
+from .models import OutboundEmail, ProfileImageJob, QueuedJob
+import io
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_SIZE = (300, 300)
+RETRY_BASE_DELAY = 30  # seconds, doubled after every failed attempt
+MAX_RETRY_DELAY = 3600
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_backend(setting='IMAGE_JOB_BACKEND'):
+    return getattr(settings, setting, 'queue')
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_JOB_THREADS', 2),
+                thread_name_prefix='image-jobs'
+            )
+        return _executor
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt of a job that failed `attempts` times"""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def enqueue_profile_picture(profile):
+    """Queue a resize of the profile's current picture (once per image)"""
+    image_name = profile.profile_picture.name
+    if ProfileImageJob.objects.filter(profile=profile, image_name=image_name).exists():
+        return None
+
+    job = ProfileImageJob.objects.create(
+        profile=profile,
+        image_name=image_name,
+        max_attempts=getattr(settings, 'IMAGE_JOB_MAX_ATTEMPTS', 5)
+    )
+    if get_backend() == 'thread':
+        # Only hand the job over once the row is visible to other connections
+        transaction.on_commit(lambda: _submit(ProfileImageJob, job.pk))
+    logger.info(f"Queued profile picture job {job.pk} for user {profile.user_id}")
+    return job
+
+
+def enqueue_email(subject, body, to, html_body='', from_email=None):
+    """Queue an email; it is sent once the surrounding transaction commits"""
+    job = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        max_attempts=getattr(settings, 'EMAIL_JOB_MAX_ATTEMPTS', 5)
+    )
+    if get_backend('EMAIL_JOB_BACKEND') == 'thread':
+        transaction.on_commit(lambda: _submit(OutboundEmail, job.pk))
+    logger.info(f"Queued email {job.pk}: {subject}")
+    return job
+
+
+def _submit(model, job_id, delay=0):
+    if delay:
+        timer = threading.Timer(delay, _submit, args=(model, job_id))
+        timer.daemon = True
+        timer.start()
+        return
+    _get_executor().submit(_run_in_thread, model, job_id)
+
+
+def _run_in_thread(model, job_id):
+    close_old_connections()
+    try:
+        claimed = model.objects.filter(
+            pk=job_id, status=QueuedJob.Status.PENDING
+        ).update(status=QueuedJob.Status.RUNNING, attempts=F('attempts') + 1)
+        if claimed:
+            job = model.objects.get(pk=job_id)
+            if not run_job(job) and job.status == QueuedJob.Status.PENDING:
+                _submit(model, job_id, delay=retry_delay(job.attempts))
+    except Exception as e:
+        logger.error(f"Error running {model.__name__} {job_id} in thread: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def claim_jobs(model, limit=10):
+    """Mark up to `limit` due jobs as running and return them"""
+    with transaction.atomic():
+        jobs = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status=QueuedJob.Status.PENDING, run_after__lte=timezone.now())
+            .order_by('run_after', 'id')[:limit]
+        )
+        if jobs:
+            model.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=QueuedJob.Status.RUNNING,
+                attempts=F('attempts') + 1,
+                updated_at=timezone.now()
+            )
+            for job in jobs:
+                job.status = QueuedJob.Status.RUNNING
+                job.attempts += 1
+    return jobs
+
+
+def requeue_stale(model, older_than):
+    """Return jobs stuck in 'running' (e.g. a killed worker) to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return model.objects.filter(
+        status=QueuedJob.Status.RUNNING, updated_at__lt=cutoff
+    ).update(status=QueuedJob.Status.PENDING, run_after=timezone.now())
+
+
+def run_job(job, handler=None):
+    """Run a claimed job and record the outcome; returns True on success"""
+    try:
+        (handler or HANDLERS[type(job)])(job)
+    except Exception as e:
+        job.last_error = f'{type(e).__name__}: {e}'
+        if job.attempts >= job.max_attempts:
+            job.status = QueuedJob.Status.FAILED
+            logger.error(f"{type(job).__name__} {job.pk} failed permanently: {str(e)}")
+        else:
+            job.status = QueuedJob.Status.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning(f"{type(job).__name__} {job.pk} failed (attempt {job.attempts}), retrying: {str(e)}")
+        job.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+        return False
+
+    job.status = QueuedJob.Status.DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return True
+
+
+def process_profile_picture(job):
+    """Shrink a profile picture to fit PROFILE_PICTURE_SIZE and build its derivatives"""
+    profile = job.profile
+    if profile.profile_picture.name != job.image_name:
+        logger.info(f"Skipping image job {job.pk}: picture was replaced")
+        return
+
+    name = resize_profile_picture(profile, job.image_name)
+    profile.avatar_variants = generate_avatar_variants(name)
+    profile.save(update_fields=['avatar_variants'])
+    logger.info(f"Built avatar derivatives for user {profile.user_id}")
+
+
+def resize_profile_picture(profile, name):
+    """Resize the stored picture in place and return its (possibly new) name"""
+    from PIL import Image
+    with default_storage.open(name, 'rb') as source, Image.open(source) as img:
+        if img.height <= PROFILE_PICTURE_SIZE[1] and img.width <= PROFILE_PICTURE_SIZE[0]:
+            return name
+        image_format = img.format
+        img.thumbnail(PROFILE_PICTURE_SIZE)
+        buffer = io.BytesIO()
+        img.save(buffer, format=image_format)
+
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        path = None
+
+    if path:
+        # Local storage: overwrite in place
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+        logger.info(f"Resized profile picture locally for user {profile.user_id}")
+        return name
+
+    # Remote storage does not overwrite (AWS_S3_FILE_OVERWRITE = False), so the
+    # resized copy may get a new name that the profile has to point at
+    new_name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    if new_name != name:
+        # Record the new name as processed so saving the profile does not queue it again
+        ProfileImageJob.objects.create(
+            profile=profile, image_name=new_name, status=QueuedJob.Status.DONE
+        )
+        profile.profile_picture.name = new_name
+        profile.save(update_fields=['profile_picture'])
+        default_storage.delete(name)
+    logger.info(f"Resized and uploaded profile picture for user {profile.user_id}")
+    return new_name
+
+
+def send_email(job, connection=None):
+    """Send a queued email, over `connection` when one is shared by a batch"""
+    message = EmailMultiAlternatives(
+        job.subject, job.body, job.from_email or None, job.to, connection=connection
+    )
+    if job.html_body:
+        message.attach_alternative(job.html_body, 'text/html')
+    message.send()
+
+
+def deliver_emails(jobs):
+    """Send claimed emails over a single connection; returns the number sent"""
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Every message retries the connection and records its own failure
+        logger.warning(f"Could not open mail connection: {str(e)}")
+    sent = 0
+    try:
+        for job in jobs:
+            sent += run_job(job, handler=lambda job: send_email(job, connection))
+    finally:
+        connection.close()
+    return sent
+
+
+HANDLERS = {
+    ProfileImageJob: process_profile_picture,
+    OutboundEmail: send_email,
+}
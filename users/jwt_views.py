@@ -6,10 +6,11 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView
 )
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import authenticate
 from .authentication import generate_tokens_for_user
+from .token_blacklist import CachedRefreshToken
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,10 +51,12 @@ class CustomTokenRefreshView(TokenRefreshView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            refresh = RefreshToken(refresh_token)
+            refresh = CachedRefreshToken(refresh_token)
             tokens = {
                 'access': str(refresh.access_token),
             }
+            if api_settings.ROTATE_REFRESH_TOKENS:
+                tokens['refresh'] = str(refresh.rotate())
             
             logger.info("Access token refreshed successfully")
             return Response(tokens, status=status.HTTP_200_OK)
@@ -83,7 +86,7 @@ class LogoutView(views.APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
             
             logger.info(f"User {request.user.username} logged out successfully")
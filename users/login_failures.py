@@ -0,0 +1,97 @@
+"""
+Failed-login accounting.
+
+By default every failure is one conditional UPDATE
+(UserSecurityProfile.record_failed_logins). With FAILED_LOGIN_BUFFER enabled,
+failures are first counted in the cache and flushed to the database in
+batches, so a login flood against one account does not serialize on its row
+lock. A batch is flushed as soon as it is FAILED_LOGIN_FLUSH_BATCH long or
+would reach the lockout threshold, so locks are never delayed. Counts below
+both limits that are never flushed expire with the lockout window.
+"""
+from django.conf import settings
+from django_blog_project.cache import default_cache, make_key
+from .models import LOCKOUT_DURATION, LOCKOUT_THRESHOLD, UserSecurityProfile
+from .security_state import forget_request_state, get_security_state
+import logging
+
+logger = logging.getLogger(__name__)
+
+FLUSH_LOCK_TIMEOUT = 10
+
+
+def _pending_key(user_id):
+    return make_key('security', 'failed', user_id)
+
+
+def _flush_lock_key(user_id):
+    return make_key('security', 'failed', user_id, 'flush')
+
+
+def is_buffered():
+    return getattr(settings, 'FAILED_LOGIN_BUFFER', False)
+
+
+def _incr_pending(user_id):
+    key = _pending_key(user_id)
+    if default_cache.add(key, 1, int(LOCKOUT_DURATION.total_seconds())):
+        return 1
+    try:
+        return default_cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        default_cache.add(key, 1, int(LOCKOUT_DURATION.total_seconds()))
+        return 1
+
+
+def flush_pending(user_id):
+    """Move a user's buffered failures to the database; returns the count flushed"""
+    lock_key = _flush_lock_key(user_id)
+    if not default_cache.add(lock_key, 1, FLUSH_LOCK_TIMEOUT):
+        # Another worker is flushing this user
+        return 0
+    try:
+        key = _pending_key(user_id)
+        count = default_cache.get(key) or 0
+        if count:
+            # Failures counted after get() stay in the buffer for the next flush
+            try:
+                default_cache.decr(key, count)
+            except ValueError:
+                pass
+            UserSecurityProfile.record_failed_logins(user_id, count)
+        return count
+    finally:
+        default_cache.delete(lock_key)
+
+
+def clear_pending(user_id):
+    """Forget buffered failures, e.g. after a successful login"""
+    default_cache.delete(_pending_key(user_id))
+
+
+def record_failed_login(user_id, request=None):
+    """Count a failed login and return the user's resulting SecurityState"""
+    if not is_buffered():
+        UserSecurityProfile.record_failed_logins(user_id)
+    else:
+        pending = _incr_pending(user_id)
+        state = get_security_state(user_id)
+        batch = getattr(settings, 'FAILED_LOGIN_FLUSH_BATCH', LOCKOUT_THRESHOLD)
+        if pending >= batch or state.failed_login_attempts + pending >= LOCKOUT_THRESHOLD:
+            flush_pending(user_id)
+
+    if request is not None:
+        forget_request_state(request)
+    return get_security_state(user_id, request)
+
+
+def record_successful_login(user, state):
+    """Reset the failure count after a successful login (``state`` is the user's SecurityState)"""
+    if state.failed_login_attempts or state.account_locked_until:
+        # Also clears the buffer
+        user.usersecurityprofile.reset_login_attempts()
+    elif is_buffered():
+        # Buffered failures are not in the snapshot but would count towards a lock
+        clear_pending(user.pk)
+
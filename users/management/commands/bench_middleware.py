@@ -0,0 +1,49 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django_blog_project.middleware import EdgeMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of EdgeMiddleware against a bare view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        user = User.objects.filter(is_active=True, is_staff=False).first()
+        scenarios = [
+            ('static file', settings.STATIC_URL + 'css/main.css', AnonymousUser()),
+            ('anonymous, public page', '/login/', AnonymousUser()),
+            ('anonymous, redirected', '/post/1/', AnonymousUser()),
+        ]
+        if user is not None:
+            scenarios.append(('authenticated', '/post/1/', user))
+
+        def view(request):
+            return HttpResponse()
+
+        middleware = EdgeMiddleware(view)
+        factory = RequestFactory()
+        for label, path, request_user in scenarios:
+            # A distinct client per request, so rate limiting is paid but never trips
+            requests = []
+            for i in range(count):
+                request = factory.get(path, REMOTE_ADDR=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}')
+                request.user = request_user
+                requests.append(request)
+
+            elapsed = {}
+            for name, handler in (('bare', view), ('edge', middleware)):
+                start = time.perf_counter()
+                for request in requests:
+                    handler(request)
+                elapsed[name] = (time.perf_counter() - start) / count * 1e6
+            self.stdout.write(
+                f'{label}: {elapsed["edge"] - elapsed["bare"]:.1f} us overhead per request '
+                f'({elapsed["edge"]:.1f} us with, {elapsed["bare"]:.1f} us without)'
+            )
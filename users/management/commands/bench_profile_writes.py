@@ -0,0 +1,66 @@
+import io
+from django.contrib.auth.models import User, update_last_login
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from users.models import Profile, ProfileImageJob
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = 'Count queries, writes and image I/O caused by a login and a plain User.save()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        scenarios = [
+            ('login (update_last_login)', lambda user: update_last_login(None, user)),
+            ('user.save()', lambda user: user.save()),
+        ]
+
+        # Everything runs in a transaction that is rolled back
+        with transaction.atomic():
+            user = User.objects.create_user('bench-profile-writes', 'bench@example.com', None)
+            buffer = io.BytesIO()
+            Image.new('RGB', (250, 250)).save(buffer, 'JPEG')
+            picture = default_storage.save('profile_pics/bench-profile-writes.jpg', ContentFile(buffer.getvalue()))
+            Profile.objects.filter(user=user).update(profile_picture=picture)
+
+            image_opens = [0]
+            original_open = Image.open
+
+            def counting_open(*args, **kwargs):
+                image_opens[0] += 1
+                return original_open(*args, **kwargs)
+
+            Image.open = counting_open
+            try:
+                for label, scenario in scenarios:
+                    queries = writes = 0
+                    image_opens[0] = 0
+                    jobs_before = ProfileImageJob.objects.count()
+                    for _ in range(iterations):
+                        # A fresh instance, as authentication backends load it
+                        fresh = User.objects.get(pk=user.pk)
+                        with CaptureQueriesContext(connection) as captured:
+                            scenario(fresh)
+                        queries += len(captured)
+                        writes += sum(
+                            1 for query in captured.captured_queries
+                            if query['sql'].lstrip().split(' ', 1)[0].upper() in WRITE_STATEMENTS
+                        )
+                    jobs = ProfileImageJob.objects.count() - jobs_before
+                    self.stdout.write(
+                        f'{label}: {queries / iterations:.1f} queries, {writes / iterations:.1f} writes, '
+                        f'{image_opens[0] / iterations:.1f} image opens, {jobs / iterations:.1f} image jobs per call'
+                    )
+            finally:
+                Image.open = original_open
+                default_storage.delete(picture)
+                transaction.set_rollback(True)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from users.avatars import current_variants, generate_avatar_variants
+from users.models import DEFAULT_PROFILE_PICTURE, Profile
+
+
+class Command(BaseCommand):
+    help = 'Build missing or stale avatar derivatives for existing profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are up to date')
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        profiles = Profile.objects.exclude(profile_picture=DEFAULT_PROFILE_PICTURE).exclude(profile_picture='')
+        for profile in profiles.iterator(chunk_size=200):
+            if current_variants(profile) and not options['force']:
+                continue
+            try:
+                profile.avatar_variants = generate_avatar_variants(profile.profile_picture.name)
+                profile.save(update_fields=['avatar_variants'])
+                built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{profile.profile_picture.name}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} profiles, {failed} failed'))
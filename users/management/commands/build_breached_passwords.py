@@ -0,0 +1,80 @@
+import hashlib
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from users.password_policy import DIGEST_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the sorted SHA-1 digest file used by the breached-password check. '
+        'Running processes keep the old file mapped until they restart.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Have I Been Pwned SHA-1 list (ordered by hash) or a plain password list')
+        parser.add_argument('--output', help='Defaults to BREACHED_PASSWORDS_FILE')
+        parser.add_argument(
+            '--plain', action='store_true',
+            help='The source holds one password per line instead of HASH:COUNT lines'
+        )
+        parser.add_argument(
+            '--min-count', type=int, default=0,
+            help='Skip hashes seen fewer times than this (HIBP source only)'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'BREACHED_PASSWORDS_FILE', None)
+        if not output:
+            raise CommandError('Pass --output or set BREACHED_PASSWORDS_FILE')
+
+        partial = f'{output}.partial'
+        try:
+            with open(partial, 'wb') as out:
+                if options['plain']:
+                    written = self.write_plain(options['source'], out)
+                else:
+                    written = self.write_hibp(options['source'], out, options['min_count'])
+        except BaseException:
+            os.remove(partial)
+            raise
+        # Atomic swap, so a process starting meanwhile never maps half a file
+        os.replace(partial, output)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} digests ({written * DIGEST_SIZE} bytes) to {output}'))
+
+    def write_plain(self, source, out):
+        # Password lists are small enough to sort in memory
+        with open(source, encoding='utf-8', errors='replace') as f:
+            digests = sorted({
+                hashlib.sha1(line.rstrip('\r\n').encode('utf-8')).digest()
+                for line in f if line.rstrip('\r\n')
+            })
+        out.write(b''.join(digests))
+        return len(digests)
+
+    def write_hibp(self, source, out, min_count):
+        # The full list does not fit in memory, so it is streamed and must
+        # already be ordered by hash
+        written = 0
+        previous = b''
+        with open(source, encoding='ascii') as f:
+            for number, line in enumerate(f, 1):
+                digest_hex, _, count = line.strip().partition(':')
+                if not digest_hex:
+                    continue
+                if min_count and int(count or 0) < min_count:
+                    continue
+                try:
+                    digest = bytes.fromhex(digest_hex)
+                except ValueError:
+                    raise CommandError(f'Line {number} is not a SHA-1 hash')
+                if len(digest) != DIGEST_SIZE:
+                    raise CommandError(f'Line {number} is not a SHA-1 hash')
+                if digest <= previous:
+                    if digest == previous:
+                        continue
+                    raise CommandError(f'Line {number} is out of order; use the list ordered by hash')
+                out.write(digest)
+                previous = digest
+                written += 1
+        return written
@@ -0,0 +1,182 @@
+from contextlib import redirect_stdout
+import io
+import json
+import random
+import subprocess
+import uuid
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from blog.models import Post
+from bench import factories, runner
+from bench.workloads import WORKLOADS, Fixture, get_workload
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed users and posts, replay a workload and report p50/p95/p99 latency, throughput '
+        'and queries per endpoint as JSON. Without --url it runs in process through the test '
+        'client on a throwaway test database; with --url it drives a running server, seeding '
+        'the configured database only with --seed (queries are only reported if that server '
+        'sends Server-Timing).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workload', default='mixed',
+            help=f'One of {", ".join(WORKLOADS)}, or a JSONL file of request specs (see bench/workloads.py)'
+        )
+        parser.add_argument('--users', type=int, default=50, help='Users to seed')
+        parser.add_argument('--posts', type=int, default=1000, help='Posts to seed')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests')
+        parser.add_argument('--warmup', type=int, default=100, help='Requests replayed before measuring')
+        parser.add_argument('--virtual-users', type=int, default=10, help='Logged-in users issuing the requests')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads issuing requests (--url only)')
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='With --url, seed the configured database first and give the seeded users a new random password'
+        )
+        parser.add_argument('--force', action='store_true', help='Allow --seed when DEBUG is off')
+        parser.add_argument(
+            '--password', help='With --url and no --seed, the password printed by the run that seeded the users'
+        )
+        parser.add_argument('--prefix', default=factories.DEFAULT_PREFIX, help='Username prefix of seeded users')
+        parser.add_argument('--random-seed', type=int, default=0, help='Seed of the request plan')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            workload = get_workload(options['workload'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if options['virtual_users'] > options['users']:
+            raise CommandError('--virtual-users cannot exceed --users')
+
+        if options['url']:
+            if options['seed']:
+                if not settings.DEBUG and not options['force']:
+                    raise CommandError(
+                        'Refusing to seed a database with DEBUG off; pass --force if it is disposable'
+                    )
+            elif not options['password']:
+                raise CommandError('Pass --seed, or --password for users seeded by an earlier run')
+            transport = runner.HTTPTransport(options['url'])
+            password = self.seed(options) if options['seed'] else options['password']
+            result = self.run(transport, workload, password, options)
+        else:
+            if options['concurrency'] > 1:
+                raise CommandError('--concurrency needs --url; the test client runs one request at a time')
+            result = self.run_in_test_database(workload, options)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                result['change_pct'] = runner.compare(result, json.load(f))
+
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.print_table(result)
+        else:
+            self.stdout.write(output)
+
+    def run_in_test_database(self, workload, options):
+        # Keep the run's rate-limit counters and cached pages apart from
+        # earlier runs and from the site itself
+        run_id = uuid.uuid4().hex[:8]
+        caches = {
+            alias: dict(config, KEY_PREFIX=f'{config.get("KEY_PREFIX", "")}:loadtest:{run_id}')
+            for alias, config in settings.CACHES.items()
+        }
+        old_name = connection.settings_dict['NAME']
+        # createcachetable reports on stdout, where the report goes
+        with redirect_stdout(io.StringIO()):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                CACHES=caches,
+            ):
+                password = self.seed(options)
+                return self.run(runner.ClientTransport(), workload, password, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        """Seed users and posts; returns the password the seeded users now share"""
+        prefix = options['prefix']
+        password = factories.random_password()
+        created = factories.create_users(options['users'], prefix, password)
+        # Users kept from an earlier run get this run's password too
+        factories.set_password(prefix, password)
+        author_ids = User.objects.filter(username__startswith=f'{prefix}-').values_list('pk', flat=True)
+        factories.create_posts(options['posts'], author_ids, random.Random(options['random_seed']))
+        self.stderr.write(f'Seeded {created} users and {options["posts"]} posts')
+        if options['url']:
+            self.stderr.write(f'Seeded users log in with --password {password}')
+        return password
+
+    def run(self, transport, workload, password, options):
+        usernames = sorted(
+            User.objects.filter(username__startswith=f'{options["prefix"]}-').values_list('username', flat=True),
+            key=lambda name: int(name.rsplit('-', 1)[1])
+        )
+        posts = list(Post.objects.values_list('id', 'date_posted'))
+        if len(usernames) < options['virtual_users'] or not posts:
+            raise CommandError('Not enough seeded users or posts; run with --seed first')
+        fixture = Fixture(usernames, posts, password)
+
+        self.stderr.write(
+            f'Replaying {options["requests"]} requests of {options["workload"]} '
+            f'through {transport.name} with {options["virtual_users"]} virtual users'
+        )
+        samples, seconds = runner.run(
+            transport, workload, fixture, options['requests'],
+            virtual_users=options['virtual_users'], concurrency=options['concurrency'],
+            warmup=options['warmup'], seed=options['random_seed'],
+        )
+        result = {
+            'meta': {
+                'commit': self.current_commit(),
+                'transport': transport.name,
+                'workload': options['workload'],
+                'users': len(usernames),
+                'posts': len(posts),
+                'virtual_users': options['virtual_users'],
+                'concurrency': options['concurrency'],
+                'random_seed': options['random_seed'],
+            },
+        }
+        result.update(runner.report(samples, seconds))
+        return result
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_table(self, result):
+        changes = result.get('change_pct', {})
+        self.stdout.write(
+            f'{"endpoint":<14} {"reqs":>6} {"errors":>6} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"queries":>8} {"p95 change":>10}'
+        )
+        rows = list(result['endpoints'].items()) + [('total', result['total'])]
+        for name, figures in rows:
+            change = changes.get(name, {}).get('p95_ms')
+            queries = figures['queries_mean']
+            self.stdout.write(
+                f'{name[:14]:<14} {figures["requests"]:>6} {figures["errors"]:>6} '
+                f'{figures["throughput_rps"]:>8.1f} {figures["p50_ms"]:>8.1f} {figures["p95_ms"]:>8.1f} '
+                f'{figures["p99_ms"]:>8.1f} {"-" if queries is None else f"{queries:.1f}":>8} '
+                f'{"-" if change is None else f"{change:+.1f}%":>10}'
+            )
@@ -0,0 +1,58 @@
+import json
+from django.core.management.base import BaseCommand
+from django_blog_project import perfstats
+
+SORT_KEYS = {
+    'time': lambda item: item[1]['time_ms'],
+    'count': lambda item: item[1]['count'],
+    'queries': lambda item: item[1]['queries'],
+    'mean': lambda item: item[1]['time_ms'] / item[1]['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Show per-view request statistics sampled by PerformanceMiddleware in every worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_KEYS, default='time', help='Order views by total time, requests, queries or mean time')
+        parser.add_argument('--json', action='store_true', help='Print the merged totals as JSON')
+        parser.add_argument('--reset', action='store_true', help='Start collecting afresh')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            generation = perfstats.reset()
+            self.stdout.write(self.style.SUCCESS(f'Statistics reset (generation {generation})'))
+            return
+
+        views, processes = perfstats.collect()
+        if options['json']:
+            self.stdout.write(json.dumps({'processes': processes, 'buckets_ms': perfstats.BUCKETS_MS, 'views': views}, indent=2))
+            return
+
+        if not views:
+            self.stdout.write('No samples published yet (workers publish every PERF_FLUSH_INTERVAL seconds)')
+            return
+
+        self.stdout.write(f'{processes} processes, latency percentiles are bucket upper bounds\n')
+        self.stdout.write(
+            f'{"view":<40} {"reqs":>6} {"mean ms":>8} {"p50":>6} {"p95":>6} {"p99":>6} '
+            f'{"queries":>8} {"sql ms":>7} {"render":>7} {"cache hit":>9} {"KB":>7}'
+        )
+        for view, entry in sorted(views.items(), key=SORT_KEYS[options['sort']], reverse=True):
+            count = entry['count']
+            lookups = entry['cache_hits'] + entry['cache_misses']
+            hit_rate = f'{entry["cache_hits"] / lookups:.0%}' if lookups else '-'
+            p50, p95, p99 = (
+                self.format_bound(perfstats.percentile(entry['buckets'], fraction))
+                for fraction in (0.5, 0.95, 0.99)
+            )
+            self.stdout.write(
+                f'{view[:40]:<40} {count:>6} {entry["time_ms"] / count:>8.1f} {p50:>6} {p95:>6} {p99:>6} '
+                f'{entry["queries"] / count:>8.1f} {entry["sql_ms"] / count:>7.1f} '
+                f'{entry["render_ms"] / count:>7.1f} {hit_rate:>9} {entry["bytes"] / count / 1024:>7.1f}'
+            )
+
+    def format_bound(self, bound):
+        if bound is None:
+            return '-'
+        return f'>{perfstats.BUCKETS_MS[-1]}' if bound == float('inf') else str(bound)
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from users.jobs import claim_jobs, requeue_stale, run_job
+from users.models import ProfileImageJob
+
+
+class Command(BaseCommand):
+    help = 'Worker that resizes queued profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when idle')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Requeue jobs left running for this many seconds by a dead worker'
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        while True:
+            close_old_connections()
+            requeued = requeue_stale(ProfileImageJob, options['stale_after'])
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+            jobs = claim_jobs(ProfileImageJob, options['batch_size'])
+            for job in jobs:
+                if run_job(job):
+                    processed += 1
+                else:
+                    failed += 1
+
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs, {failed} failed'))
@@ -0,0 +1,77 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from users.token_blacklist import forget, is_blacklisted, prune_expired
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired outstanding/blacklisted refresh tokens in batches and report '
+        'table sizes and blacklist lookup latency. Meant to run from cron, e.g. hourly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--samples', type=int, default=200, help='Lookups timed for the latency report')
+        parser.add_argument('--no-prune', action='store_true', help='Only report')
+
+    def handle(self, *args, **options):
+        self.report_size('before')
+        if not options['no_prune']:
+            deleted = {BlacklistedToken: 0, OutstandingToken: 0}
+            batches = 0
+            for model, count in prune_expired(options['batch_size'], options['pause']):
+                deleted[model] += count
+                batches += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted[BlacklistedToken]} blacklisted and '
+                f'{deleted[OutstandingToken]} outstanding tokens in {batches} batches'
+            ))
+            self.report_size('after')
+        if options['samples']:
+            self.report_latency(options['samples'])
+
+    def report_size(self, label):
+        parts = []
+        for model in (OutstandingToken, BlacklistedToken):
+            size = f'{model.objects.count()} rows'
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_size_pretty(pg_total_relation_size(%s))', [model._meta.db_table])
+                    size += f', {cursor.fetchone()[0]}'
+            parts.append(f'{model._meta.db_table}: {size}')
+        self.stdout.write(f'{label}: ' + '; '.join(parts))
+
+    def report_latency(self, samples):
+        # Unknown jtis are the common case (a token being refreshed) and the
+        # most expensive one for the database: a full probe of the index
+        expires_at = time.time() + 60
+        jtis = [uuid.uuid4().hex for _ in range(samples)]
+        timings = {
+            'database': self.time_lookups(
+                jtis, lambda jti: BlacklistedToken.objects.filter(token__jti=jti).exists()
+            ),
+            # The first pass fills the cache front like a newly seen token
+            'cache miss': self.time_lookups(jtis, lambda jti: is_blacklisted(jti, expires_at)),
+            'cache hit': self.time_lookups(jtis, lambda jti: is_blacklisted(jti, expires_at)),
+        }
+        for jti in jtis:
+            forget(jti)
+        for label, values in timings.items():
+            values.sort()
+            self.stdout.write(
+                f'{label} lookup: median {statistics.median(values):.3f} ms, '
+                f'p95 {values[int(len(values) * 0.95) - 1]:.3f} ms'
+            )
+
+    def time_lookups(self, jtis, lookup):
+        timings = []
+        for jti in jtis:
+            start = time.perf_counter()
+            lookup(jti)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from users.jobs import claim_jobs, deliver_emails, requeue_stale
+from users.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Worker that sends queued emails, one mail connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed and sent per connection')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when idle')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Requeue emails left sending for this many seconds by a dead worker'
+        )
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        while True:
+            close_old_connections()
+            requeued = requeue_stale(OutboundEmail, options['stale_after'])
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale emails'))
+
+            jobs = claim_jobs(OutboundEmail, options['batch_size'])
+            if jobs:
+                delivered = deliver_emails(jobs)
+                sent += delivered
+                failed += len(jobs) - delivered
+            else:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails, {failed} failed'))
@@ -0,0 +1,42 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_blog_project.importtime import COLD_START, heavy_imports, profile_imports, total_ms
+
+
+class Command(BaseCommand):
+    help = 'Profile a cold worker start with -X importtime and report the costliest imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Rows per table')
+        parser.add_argument('--code', default=COLD_START, help='Python code to profile instead of a cold start')
+
+    def handle(self, *args, **options):
+        imports = profile_imports(options['code'])
+        limit = options['limit']
+
+        packages = defaultdict(int)
+        for entry in imports:
+            packages[entry.module.split('.', 1)[0]] += entry.self_us
+
+        self.stdout.write(f'{len(imports)} modules imported in {total_ms(imports):.1f} ms')
+
+        self.stdout.write('\nSlowest imports (cumulative ms, self ms):')
+        for entry in sorted(imports, key=lambda entry: entry.cumulative_us, reverse=True)[:limit]:
+            self.stdout.write(
+                f'  {entry.cumulative_us / 1000:8.1f} {entry.self_us / 1000:8.1f}  '
+                f'{"  " * entry.depth}{entry.module}'
+            )
+
+        self.stdout.write('\nBy top-level package (ms):')
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            self.stdout.write(f'  {self_us / 1000:8.1f}  {package}')
+
+        heavy = heavy_imports(imports)
+        if heavy:
+            self.stdout.write(self.style.WARNING(f'\nHeavy modules imported at startup: {", ".join(heavy)}'))
+
+        budget = getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', None)
+        if budget is not None and options['code'] == COLD_START:
+            style = self.style.SUCCESS if total_ms(imports) <= budget else self.style.ERROR
+            self.stdout.write(style(f'\nBudget: {total_ms(imports):.1f} of {budget} ms'))
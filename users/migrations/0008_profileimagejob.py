@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_alter_profile_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('image_name', models.CharField(max_length=255)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='users.profile')),
+            ],
+            options={
+                'verbose_name': 'Profile Image Job',
+                'verbose_name_plural': 'Profile Image Jobs',
+                'abstract': False,
+                'indexes': [models.Index(fields=['status', 'run_after'], name='users_profileimagejob_due_idx')],
+            },
+        ),
+    ]
@@ -1,71 +1,165 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
 from django.contrib.auth.models import User
 from django.core.files.storage import default_storage
 from django.core.validators import MinLengthValidator
 from django.utils import timezone
 from django.conf import settings
-from PIL import Image
+import copy
 import secrets
-import boto3
-import io
-import os
 import sys
-import pyotp
+from .security_state import invalidate_security_state
 import logging
 
 logger = logging.getLogger(__name__)
 IS_DEVELOPMENT = 'dev' in sys.prefix.lower()
+DEFAULT_PROFILE_PICTURE = 'profile_pics/default.jpg'
+LOCKOUT_THRESHOLD = 5
+LOCKOUT_DURATION = timezone.timedelta(minutes=30)
 
-class Profile(models.Model):
+class DirtyFieldsMixin:
+    """
+    Track which concrete fields changed since the instance was loaded or saved.
+
+    Values are compared as stored (file fields by name), so assigning the
+    same value back does not make a field dirty. Deferred fields that were
+    never loaded are only dirty once assigned.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    @staticmethod
+    def _comparable(value):
+        if isinstance(value, models.fields.files.FieldFile):
+            return None if not value._committed else value.name
+        return value
+
+    def _remember_loaded_values(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (
+                fields is None or field.name in fields or field.attname in fields
+            ):
+                # Copy so in-place changes to JSON lists/dicts are noticed
+                loaded[field.attname] = copy.deepcopy(self._comparable(self.__dict__[field.attname]))
+
+    def get_dirty_fields(self):
+        """Names of the fields that would change on save"""
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        loaded = self.__dict__.get('_loaded_values')
+        if self._state.adding or loaded is None:
+            return [field.name for field in fields]
+        return [
+            field.name for field in fields
+            if field.attname in self.__dict__ and (
+                field.attname not in loaded
+                or self._comparable(self.__dict__[field.attname]) != loaded[field.attname]
+            )
+        ]
+
+    def save_dirty(self):
+        """Save only the changed fields; returns the names that were written"""
+        dirty = self.get_dirty_fields()
+        if dirty:
+            self.save(update_fields=dirty if not self._state.adding else None)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('fields'))
+
+
+class Profile(DirtyFieldsMixin, models.Model):
     """User profile model with auto-resizing profile picture"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     profile_picture = models.ImageField(
-        default='profile_pics/default.jpg',
+        default=DEFAULT_PROFILE_PICTURE,
         upload_to='profile_pics'
     )
+    # Sized WebP/AVIF/JPEG derivatives of profile_picture (see users/avatars.py)
+    avatar_variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f'{self.user.username} Profile'
 
     def save(self, *args, **kwargs):
-        """Save profile and process profile picture if it exists"""
+        """Save profile and queue the picture for resizing off the request path"""
+        update_fields = kwargs.get('update_fields')
+        picture_changed = 'profile_picture' in self.get_dirty_fields() and (
+            update_fields is None or 'profile_picture' in update_fields
+        )
         super().save(*args, **kwargs)
 
-        if self.profile_picture and self.profile_picture.name != 'profile_pics/default.jpg':
-            try:
-                if IS_DEVELOPMENT:
-                    # Local development handling
-                    image_path = os.path.join(settings.MEDIA_ROOT, self.profile_picture.name)
-                    with Image.open(self.profile_picture.path) as img:
-                        if img.height > 300 or img.width > 300:
-                            output_size = (300, 300)
-                            img.thumbnail(output_size)
-                            img.save(self.profile_picture.path)
-                            logger.info(f"Resized profile picture locally for user {self.user.username}")
-                else:
-                    # Production S3 handling
-                    s3_file = default_storage.open(self.profile_picture.name, 'rb')
-                    with Image.open(s3_file) as img:
-                        if img.height > 300 or img.width > 300:
-                            output_size = (300, 300)
-                            img.thumbnail(output_size)
-                            
-                            # Save the resized image to bytes buffer
-                            buffer = io.BytesIO()
-                            img.save(buffer, format=img.format)
-                            buffer.seek(0)
-                            
-                            # Upload resized image back to S3
-                            default_storage.save(self.profile_picture.name, buffer)
-                            logger.info(f"Resized and uploaded profile picture to S3 for user {self.user.username}")
-                    
-                    s3_file.close()
-
-            except Exception as e:
-                logger.error(f"Error processing profile picture for user {self.user.username}: {str(e)}")
-
-
-class UserSecurityProfile(models.Model):
+        if not picture_changed:
+            return
+        if self.profile_picture and self.profile_picture.name != DEFAULT_PROFILE_PICTURE:
+            from .jobs import enqueue_profile_picture
+            enqueue_profile_picture(self)
+
+
+class QueuedJob(models.Model):
+    """Database-backed background job with status tracking and retries"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            # Workers poll for due pending jobs
+            models.Index(fields=['status', 'run_after'], name='%(app_label)s_%(class)s_due_idx'),
+        ]
+
+
+class ProfileImageJob(QueuedJob):
+    """Resize of an uploaded profile picture"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='image_jobs')
+    image_name = models.CharField(max_length=255)
+
+    class Meta(QueuedJob.Meta):
+        verbose_name = "Profile Image Job"
+        verbose_name_plural = "Profile Image Jobs"
+
+    def __str__(self):
+        return f'{self.image_name} ({self.status})'
+
+
+class OutboundEmail(QueuedJob):
+    """Email waiting to be sent by the mail worker"""
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+
+    class Meta(QueuedJob.Meta):
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+
+    def __str__(self):
+        return f'{self.subject} to {", ".join(self.to)} ({self.status})'
+
+
+class UserSecurityProfile(DirtyFieldsMixin, models.Model):
     """Security profile for managing 2FA and account security settings"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     api_key = models.CharField(max_length=64, blank=True, null=True, unique=True)
@@ -105,6 +199,7 @@ class UserSecurityProfile(models.Model):
 
     def generate_2fa_secret(self):
         """Generate a new 2FA secret key"""
+        import pyotp
         try:
             self.two_factor_secret = pyotp.random_base32()
             self.save()
@@ -118,6 +213,7 @@ class UserSecurityProfile(models.Model):
         """Verify a 2FA token"""
         if not self.two_factor_secret:
             return False
+        import pyotp
         try:
             totp = pyotp.TOTP(self.two_factor_secret)
             is_valid = totp.verify(token)
@@ -134,6 +230,7 @@ class UserSecurityProfile(models.Model):
         """Get the URI for QR code generation"""
         if not self.two_factor_secret:
             return None
+        import pyotp
         try:
             totp = pyotp.TOTP(self.two_factor_secret)
             return totp.provisioning_uri(
@@ -146,6 +243,7 @@ class UserSecurityProfile(models.Model):
 
     def generate_backup_codes(self, count=8):
         """Generate new backup codes for 2FA recovery"""
+        import pyotp
         try:
             codes = []
             for _ in range(count):
@@ -172,20 +270,45 @@ class UserSecurityProfile(models.Model):
             logger.error(f"Error verifying backup code: {str(e)}")
             return False
 
+    @classmethod
+    def record_failed_logins(cls, user_id, count=1):
+        """
+        Add `count` failed attempts for a user in a single conditional UPDATE.
+
+        The counter is incremented in the database (no lost updates under
+        concurrent failures), an expired lock restarts the count, and the lock
+        is set in the same statement once LOCKOUT_THRESHOLD is reached. Only
+        the three accounting columns are written. Returns the rows updated.
+        """
+        now = timezone.now()
+        lock_until = now + LOCKOUT_DURATION
+        expired = Q(account_locked_until__lte=now)
+        updated = cls.objects.filter(user_id=user_id).update(
+            failed_login_attempts=Case(
+                When(expired, then=Value(count)),
+                default=F('failed_login_attempts') + count,
+            ),
+            account_locked_until=Case(
+                When(expired, then=Value(lock_until if count >= LOCKOUT_THRESHOLD else None)),
+                When(failed_login_attempts__gte=LOCKOUT_THRESHOLD - count, then=Value(lock_until)),
+                default=F('account_locked_until'),
+                output_field=models.DateTimeField(),
+            ),
+            last_failed_login=now,
+        )
+        # update() bypasses post_save, so drop the cached snapshot here
+        invalidate_security_state(user_id)
+        return updated
+
     def record_failed_login(self):
         """Record a failed login attempt and handle account lockout"""
         try:
-            self.failed_login_attempts += 1
-            self.last_failed_login = timezone.now()
-            
-            # Lock account after 5 failed attempts
-            if self.failed_login_attempts >= 5:
-                self.account_locked_until = timezone.now() + timezone.timedelta(minutes=30)
+            self.record_failed_logins(self.user_id)
+            self.refresh_from_db(fields=['failed_login_attempts', 'last_failed_login', 'account_locked_until'])
+            if self.is_account_locked() and self.failed_login_attempts >= LOCKOUT_THRESHOLD:
                 logger.warning(
                     f"Account locked for user {self.user.username} due to multiple failed attempts"
                 )
-            
-            self.save()
         except Exception as e:
             logger.error(f"Error recording failed login: {str(e)}")
             raise
@@ -193,24 +316,23 @@ class UserSecurityProfile(models.Model):
     def reset_login_attempts(self):
         """Reset failed login attempts after successful login"""
         try:
+            from .login_failures import clear_pending
+            
             self.failed_login_attempts = 0
             self.last_failed_login = None
             self.account_locked_until = None
-            self.save()
+            self.save(update_fields=['failed_login_attempts', 'last_failed_login', 'account_locked_until'])
+            clear_pending(self.user_id)
             logger.info(f"Reset login attempts for user {self.user.username}")
         except Exception as e:
             logger.error(f"Error resetting login attempts: {str(e)}")
             raise
 
     def is_account_locked(self):
-        """Check if the account is currently locked"""
+        """Check if the account is currently locked (read-only; expired locks are cleared lazily)"""
         if not self.account_locked_until:
             return False
-        is_locked = timezone.now() < self.account_locked_until
-        if not is_locked:
-            # Reset if lock has expired
-            self.reset_login_attempts()
-        return is_locked
+        return timezone.now() < self.account_locked_until
 
     def should_change_password(self):
         """Check if password change is required (e.g., every 90 days)"""
@@ -0,0 +1,172 @@
+"""
+Password and email policy.
+
+Email rules are applied by the registration/update forms. Password rules
+run as an AUTH_PASSWORD_VALIDATORS entry (PasswordPolicyValidator), so
+registration, password change/reset and createsuperuser share them. Everything that
+can be prepared ahead of time is: patterns are compiled at import, the
+disposable-domain list is read into a set once per process, and the
+breached-password list is a memory-mapped file searched in place.
+
+The breached-password file holds raw 20-byte SHA-1 digests, sorted, with no
+separators, so a lookup is a binary search over fixed-size records and never
+reads the file into memory. Build it from a Have I Been Pwned SHA-1 download
+(or a plain password list) with ``manage.py build_breached_passwords``.
+"""
+import bisect
+import hashlib
+import mmap
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ValidationError
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIN_PASSWORD_LENGTH = 12
+DIGEST_SIZE = 20
+DEFAULT_DISPOSABLE_DOMAINS_FILE = Path(__file__).resolve().parent / 'data' / 'disposable_domains.txt'
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+COMMON_PATTERN = re.compile(r'\b(123|321|abc|cba|password|qwerty|admin)\b')
+
+# (pattern, error message, log message), checked in order
+COMPLEXITY_RULES = (
+    (re.compile(r'[A-Z]'), 'Password must contain at least one uppercase letter.', 'uppercase'),
+    (re.compile(r'[a-z]'), 'Password must contain at least one lowercase letter.', 'lowercase'),
+    (re.compile(r'[0-9]'), 'Password must contain at least one number.', 'number'),
+    (re.compile(r'[!@#$%^&*(),._?":{}|<>]'), 'Password must contain at least one special character.', 'special character'),
+)
+
+
+@lru_cache(maxsize=None)
+def get_disposable_domains():
+    """Disposable email domains, one per line in DISPOSABLE_EMAIL_DOMAINS_FILE"""
+    path = getattr(settings, 'DISPOSABLE_EMAIL_DOMAINS_FILE', None) or DEFAULT_DISPOSABLE_DOMAINS_FILE
+    with open(path, encoding='utf-8') as f:
+        domains = frozenset(
+            line.strip().lower() for line in f
+            if line.strip() and not line.startswith('#')
+        )
+    logger.info(f"Loaded {len(domains)} disposable email domains")
+    return domains
+
+
+def is_disposable_domain(domain):
+    """Whether a domain, or any domain it is a subdomain of, is disposable"""
+    domains = get_disposable_domains()
+    parts = domain.lower().rstrip('.').split('.')
+    return any('.'.join(parts[i:]) in domains for i in range(len(parts) - 1))
+
+
+class _Digests:
+    """Sequence view of the sorted digests in a memory-mapped file"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // DIGEST_SIZE
+
+    def __getitem__(self, index):
+        start = index * DIGEST_SIZE
+        return self.buffer[start:start + DIGEST_SIZE]
+
+
+class BreachedPasswords:
+    """Membership test against a sorted file of SHA-1 digests"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % DIGEST_SIZE:
+                raise OSError(f'{path} is not a file of {DIGEST_SIZE}-byte digests')
+            # An empty file cannot be mapped; the mapping outlives the file object
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.digests = _Digests(self.buffer)
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, password):
+        digest = hashlib.sha1(password.encode('utf-8')).digest()
+        index = bisect.bisect_left(self.digests, digest)
+        return index < len(self.digests) and self.digests[index] == digest
+
+
+_breached = None
+_breached_lock = threading.Lock()
+
+
+def get_breached_passwords():
+    """The BREACHED_PASSWORDS_FILE index, or None when it is not configured"""
+    global _breached
+    path = getattr(settings, 'BREACHED_PASSWORDS_FILE', None)
+    if not path:
+        return None
+    with _breached_lock:
+        if _breached is None or _breached.path != path:
+            try:
+                _breached = BreachedPasswords(path)
+            except OSError as e:
+                logger.error(f"Breached password file unavailable: {str(e)}")
+                return None
+    return _breached
+
+
+def check_password(password, username='', email=''):
+    """Raise ValidationError if the password breaks the policy"""
+    if len(password) < MIN_PASSWORD_LENGTH:
+        logger.warning("Password length requirement not met")
+        raise ValidationError(f'Password must be at least {MIN_PASSWORD_LENGTH} characters long.')
+
+    for pattern, message, requirement in COMPLEXITY_RULES:
+        if not pattern.search(password):
+            logger.warning(f"Password {requirement} requirement not met")
+            raise ValidationError(message)
+
+    lowered = password.lower()
+    personal = [value.lower() for value in (username, email.split('@')[0]) if value]
+    if COMMON_PATTERN.search(lowered) or any(value in lowered for value in personal):
+        logger.warning("Password contains common pattern or personal info")
+        raise ValidationError('Password contains common patterns or personal information.')
+
+    breached = get_breached_passwords()
+    if breached is not None and password in breached:
+        logger.warning("Password found in breached password list")
+        raise ValidationError('This password has appeared in a data breach. Please choose another.')
+
+
+def check_email(email):
+    """Raise ValidationError if the address is malformed or disposable"""
+    if not EMAIL_PATTERN.match(email):
+        logger.warning(f"Invalid email format attempt: {email}")
+        raise ValidationError('Please enter a valid email address.')
+
+    domain = email.rsplit('@', 1)[1]
+    if is_disposable_domain(domain):
+        logger.warning(f"Disposable email domain attempt: {domain}")
+        raise ValidationError('Disposable email addresses are not allowed.')
+
+
+class PasswordPolicyValidator:
+    """AUTH_PASSWORD_VALIDATORS entry applying check_password()"""
+
+    def validate(self, password, user=None):
+        check_password(
+            password,
+            getattr(user, 'username', '') or '',
+            getattr(user, 'email', '') or ''
+        )
+
+    def get_help_text(self):
+        return (
+            f'Your password must be at least {MIN_PASSWORD_LENGTH} characters long, mix upper '
+            'and lower case letters, numbers and special characters, and must not contain '
+            'your username or a known breached password.'
+        )
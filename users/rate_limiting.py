@@ -1,11 +1,129 @@
-from django.core.cache import cache
+from django.conf import settings
 from django.http import HttpResponseForbidden
-from functools import wraps
+from django.utils.module_loading import import_string
+from functools import lru_cache, wraps
 from django.utils.decorators import method_decorator
 from django.shortcuts import render
+from collections import namedtuple
+from django.core.cache import caches
+from django_blog_project.cache import RATELIMIT, CacheProxy, ratelimit_cache
+import math
 import time
 import sys
 
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'retry_after'])
+
+
+def get_client_ip(request):
+    """Get the client IP, preferring the first X-Forwarded-For hop"""
+    ip = request.META.get('HTTP_X_FORWARDED_FOR', request.META.get('REMOTE_ADDR'))
+    if ip and "," in ip:
+        ip = ip.split(",")[0].strip()
+    return ip
+
+
+class RateLimiter:
+    """
+    Base class for rate limiting engines.
+
+    Engines keep a constant amount of integer state per key in a shared cache
+    and only ever update it with ``add``/``incr``, which are atomic on
+    memcached and Redis. A request is counted before it is checked, so
+    concurrent workers cannot all pass a stale read of the counter.
+    """
+
+    def __init__(self, cache_alias=None):
+        alias = cache_alias or getattr(settings, 'RATE_LIMIT_CACHE', RATELIMIT)
+        # A proxy, not caches[alias]: Django hands out a connection per thread
+        self.cache = ratelimit_cache if alias == RATELIMIT else CacheProxy(caches, alias)
+
+    def hit(self, key, limit, period):
+        """Record a request for ``key`` and report whether it is allowed"""
+        raise NotImplementedError
+
+    def _increment(self, key, timeout):
+        """Atomically bump a counter, creating it if it does not exist yet"""
+        if self.cache.add(key, 1, timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.add(key, 1, timeout)
+            return 1
+
+    def _decrement(self, key):
+        """Take back a hit that was refused"""
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # Already expired: nothing to take back
+            pass
+
+
+class FixedWindowLimiter(RateLimiter):
+    """One counter per key and window of ``period`` seconds"""
+
+    def hit(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        window_key = f'{key}:{window}'
+
+        # Refused hits stay counted: the window ends at the same time anyway
+        if self._increment(window_key, period) > limit:
+            return RateLimitResult(False, (window + 1) * period - now)
+        return RateLimitResult(True, 0)
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """
+    Sliding-window counter.
+
+    The request rate is estimated from the current and previous fixed windows,
+    weighting the previous count by how much of it still overlaps the sliding
+    window. This needs two integers per key instead of one timestamp per
+    request.
+    """
+
+    def hit(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        current_key = f'{key}:{window}'
+        previous_key = f'{key}:{window - 1}'
+
+        # The previous window's count is needed for a whole period after it ends
+        current = self._increment(current_key, period * 2) - 1
+        previous = self.cache.get(previous_key, 0)
+        elapsed = (now % period) / period
+
+        if previous * (1 - elapsed) + current >= limit:
+            # Refused hits would carry over into the next window's estimate
+            self._decrement(current_key)
+            return RateLimitResult(False, self._retry_after(limit, period, current, previous, elapsed))
+        return RateLimitResult(True, 0)
+
+    @staticmethod
+    def _retry_after(limit, period, current, previous, elapsed):
+        """Seconds until the weighted estimate drops below the limit"""
+        if current >= limit or not previous:
+            return (1 - elapsed) * period
+        needed = 1 - (limit - current) / previous
+        return max(needed - elapsed, 0) * period
+
+
+@lru_cache(maxsize=None)
+def _get_rate_limiter(engine, cache_alias):
+    return import_string(engine)(cache_alias)
+
+
+def get_rate_limiter():
+    """Return the engine configured by RATE_LIMIT_ENGINE and RATE_LIMIT_CACHE"""
+    return _get_rate_limiter(
+        getattr(settings, 'RATE_LIMIT_ENGINE', 'users.rate_limiting.SlidingWindowLimiter'),
+        getattr(settings, 'RATE_LIMIT_CACHE', RATELIMIT),
+    )
+
+
 def rate_limit(key_prefix, limit=5, period=300):
     """
     Rate limiting decorator that limits views based on IP and optional user ID
@@ -19,27 +137,15 @@ def rate_limit(key_prefix, limit=5, period=300):
         @wraps(view_func)
         def wrapped_view(request, *args, **kwargs):
             if not request.user.is_staff:  # Staff bypass
-                # Get IP address with fall back
-                ip = request.META.get('HTTP_X_FORWARDED_FOR', request.META.get('REMOTE_ADDR'))
-                if ip and "," in ip:
-                    ip = ip.split(",")[0].strip()
+                ip = get_client_ip(request)
 
                 # Add user ID if authenticated for more precise limiting
                 user_id = request.user.id if request.user.is_authenticated else None
                 cache_key = f"rate_limit:{key_prefix}:{ip}:{user_id}"
 
-                # Get current requests from cache
-                requests = cache.get(cache_key, [])
-                now = time.time()
-                
-                # Clean old requests
-                requests = [req for req in requests if req > now - period]
-                
-                # Check if limit is exceeded
-                if len(requests) >= limit:
-                    # Calculate wait time
-                    oldest_request = min(requests) if requests else now
-                    wait_time = int((oldest_request + period - now) / 60) + 1  # Convert to minutes and round up
+                result = get_rate_limiter().hit(cache_key, limit, period)
+                if not result.allowed:
+                    wait_time = max(math.ceil(result.retry_after / 60), 1)  # Minutes, rounded up
                     
                     return render(request, 'users/rate_limit_exceeded.html', {
                         'wait_time': wait_time,
@@ -47,10 +153,6 @@ def rate_limit(key_prefix, limit=5, period=300):
                         'message': f'You have exceeded the {key_prefix} attempt limit.'
                     }, status=429)
 
-                # Add current request timestamp
-                requests.append(now)
-                cache.set(cache_key, requests, period)
-
             return view_func(request, *args, **kwargs)
         return wrapped_view
     return decorator
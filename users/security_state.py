@@ -0,0 +1,116 @@
+"""
+Per-user security state.
+
+Lockout, 2FA and password-age checks run on many requests but only need a
+handful of UserSecurityProfile columns. They are loaded into a small
+SecurityState snapshot that is memoized on the request and cached across
+requests in the default tier. Saving or deleting the profile invalidates it
+by bumping a per-user generation; a snapshot is only used while it carries the
+current generation, so a reader that loaded the row just before a change
+cannot cache the stale copy over the invalidation.
+Snapshots are read-only: an expired lock simply reads as unlocked.
+"""
+import time
+from collections import namedtuple
+from django.utils import timezone
+from django_blog_project.cache import default_cache, make_key
+
+STATE_TIMEOUT = 300
+PASSWORD_MAX_AGE_DAYS = 90
+STATE_FIELDS = (
+    'account_locked_until',
+    'failed_login_attempts',
+    'two_factor_enabled',
+    'require_password_change',
+    'password_last_changed',
+)
+
+
+class SecurityState(namedtuple('SecurityState', STATE_FIELDS)):
+    """Snapshot of the security columns of a UserSecurityProfile"""
+    __slots__ = ()
+
+    def is_locked(self, now=None):
+        if not self.account_locked_until:
+            return False
+        return (now or timezone.now()) < self.account_locked_until
+
+    def should_change_password(self, now=None):
+        if self.require_password_change:
+            return True
+        if not self.password_last_changed:
+            return False
+        return ((now or timezone.now()) - self.password_last_changed).days >= PASSWORD_MAX_AGE_DAYS
+
+
+# Users without a security profile (it is created by a post_save signal)
+EMPTY_STATE = SecurityState(None, 0, False, False, None)
+
+
+def _cache_key(user_id):
+    return make_key('security', 'state', user_id)
+
+
+def _generation_key(user_id):
+    return make_key('security', 'generation', user_id)
+
+
+def _start_generation(user_id):
+    """Create a missing generation counter and return its value"""
+    key = _generation_key(user_id)
+    # Start from the clock so an evicted counter never reuses an old value
+    default_cache.add(key, int(time.time()), None)
+    return default_cache.get(key)
+
+
+def load_security_state(user_id):
+    """Read the snapshot straight from the database"""
+    from .models import UserSecurityProfile
+    row = UserSecurityProfile.objects.filter(user_id=user_id).values_list(*STATE_FIELDS).first()
+    return SecurityState(*row) if row else EMPTY_STATE
+
+
+def get_security_state(user, request=None):
+    """
+    Security state of a user (or user id), loaded at most once per request.
+
+    Pass the request to memoize on it; DRF requests are unwrapped so the
+    snapshot is shared with Django middleware and decorators.
+    """
+    user_id = getattr(user, 'pk', user)
+    if request is not None:
+        request = getattr(request, '_request', request)
+        memo = request.__dict__.setdefault('_security_state', {})
+        if user_id in memo:
+            return memo[user_id]
+
+    key, generation_key = _cache_key(user_id), _generation_key(user_id)
+    cached = default_cache.get_many([key, generation_key])
+    generation = cached.get(generation_key)
+    if generation is None:
+        generation = _start_generation(user_id)
+
+    entry = cached.get(key)
+    if entry is not None and entry[0] == generation:
+        state = SecurityState(*entry[1])
+    else:
+        # Tagged with the generation read before loading: if the profile
+        # changes meanwhile, the entry is already outdated when stored
+        state = load_security_state(user_id)
+        default_cache.set(key, (generation, tuple(state)), STATE_TIMEOUT)
+
+    if request is not None:
+        memo[user_id] = state
+    return state
+
+
+def forget_request_state(request):
+    """Drop the request memo after the state was changed mid-request"""
+    getattr(request, '_request', request).__dict__.pop('_security_state', None)
+
+
+def invalidate_security_state(user_id):
+    try:
+        default_cache.incr(_generation_key(user_id))
+    except ValueError:
+        _start_generation(user_id)
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 from .models import Profile, UserSecurityProfile
+from .security_state import invalidate_security_state
+from .authentication import invalidate_auth_user
+from .token_blacklist import forget, remember_blacklisted
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,11 +31,44 @@ def create_user_profiles(sender, instance, created, **kwargs):
             raise
 
 @receiver(post_save, sender=User)
-def save_user_profiles(sender, instance, **kwargs):
-    """Save both profiles when user is saved"""
+def save_user_profiles(sender, instance, created, **kwargs):
+    """Save changes made to the user's profiles through this user instance"""
+    if created:
+        return
     try:
-        instance.profile.save()
-        instance.usersecurityprofile.save()
+        # Only profiles already loaded on this instance can hold unsaved
+        # changes, and of those only the changed fields are written
+        for name in ('profile', 'usersecurityprofile'):
+            related = instance._state.fields_cache.get(name)
+            if related is not None:
+                related.save_dirty()
     except Exception as e:
         logger.error(f"Error saving profiles for user {instance.username}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+@receiver(post_save, sender=UserSecurityProfile)
+@receiver(post_delete, sender=UserSecurityProfile)
+def invalidate_security_state_cache(sender, instance, **kwargs):
+    """Drop the cached lockout/2FA snapshot of the user"""
+    invalidate_security_state(instance.user_id)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    """Drop the cached API authentication fields of the user"""
+    invalidate_auth_user(instance.pk)
+
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_token(sender, instance, created, **kwargs):
+    """Let the blacklist cache reject the token without a query"""
+    if created:
+        remember_blacklisted(instance.token.jti, instance.token.expires_at.timestamp())
+
+@receiver(post_delete, sender=BlacklistedToken)
+def forget_blacklisted_token(sender, instance, **kwargs):
+    """Drop the cached entry when a token is taken off the blacklist"""
+    # Pruned rows belong to expired tokens whose entries have expired too, so
+    # the jti is not worth a query per row
+    token = instance._state.fields_cache.get('token')
+    if token is not None:
+        forget(token.jti)
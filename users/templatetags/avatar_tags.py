@@ -0,0 +1,49 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+from users.avatars import AVATAR_FORMATS, FALLBACK_FORMAT, current_variants
+
+register = template.Library()
+
+
+def _srcset(names):
+    return ', '.join(
+        f'{default_storage.url(name)} {size}w'
+        for size, name in sorted(names.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def avatar(profile, css_class='rounded-circle article-img', display_size=65, alt=''):
+    """
+    Render a profile picture as <picture> with srcset for every derivative.
+
+    Usage: {% avatar post.author.profile "rounded-circle article-img" 65 %}
+    Falls back to the original picture until derivatives exist.
+    """
+    formats = current_variants(profile)
+    if not formats or FALLBACK_FORMAT not in formats:
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" width="{}" height="{}" loading="lazy">',
+            css_class, profile.profile_picture.url, alt, display_size, display_size
+        )
+
+    sizes = f'{display_size}px'
+    fallback = formats[FALLBACK_FORMAT]
+    # Smallest derivative that still covers the slot on a 1x screen
+    src_size = min((int(size) for size in fallback if int(size) >= display_size), default=None)
+    src = fallback[str(src_size)] if src_size else fallback[max(fallback, key=int)]
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (AVATAR_FORMATS[fmt][1], _srcset(names), sizes)
+            for fmt, names in formats.items() if fmt != FALLBACK_FORMAT
+        )
+    )
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}" '
+        'width="{}" height="{}" loading="lazy" decoding="async"></picture>',
+        sources, css_class, default_storage.url(src), _srcset(fallback), sizes, alt,
+        display_size, display_size
+    )
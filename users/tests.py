@@ -1,5 +1,766 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User, update_last_login
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.http import HttpRequest
+from django.template import Context, Template
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from blog.models import Post
+from users.authentication import get_auth_user
+from users.avatars import AVATAR_SIZES, generate_avatar_variants
+from users.forms import UserRegisterForm
+from users.login_failures import flush_pending, record_failed_login, record_successful_login
+from users.jobs import PROFILE_PICTURE_SIZE, claim_jobs, deliver_emails, enqueue_email, run_job
+from users.models import LOCKOUT_THRESHOLD, OutboundEmail, Profile, ProfileImageJob
+from users import password_policy
+from users.password_policy import BreachedPasswords, check_email, get_disposable_domains
+from users.rate_limiting import FixedWindowLimiter, SlidingWindowLimiter, get_rate_limiter
+from users.security_state import EMPTY_STATE, STATE_TIMEOUT, get_security_state, load_security_state
+from users.token_blacklist import CachedRefreshToken, prune_expired
+from django_blog_project.cache import default_cache, page_cache, ratelimit_cache
+from django_blog_project import perfstats
+from django_blog_project.importtime import heavy_modules, loaded_modules
+from django_blog_project.middleware import resolve_url_name
+from bench import factories, runner
+from bench.workloads import WORKLOADS, Fixture
+from users.models import UserSecurityProfile
 
-# Create your tests here.
 
+class ProfileWriteTests(TestCase):
+    """User saves must only write profile fields that actually changed"""
 
+    def setUp(self):
+        self.user = User.objects.create_user('writer', 'writer@example.com', 'password')
+        Profile.objects.filter(user=self.user).update(profile_picture='profile_pics/writer.jpg')
+
+    def test_login_only_updates_last_login(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+
+    def test_unchanged_profiles_are_not_saved(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile, user.usersecurityprofile
+        with self.assertNumQueries(1):
+            user.save()
+        self.assertFalse(ProfileImageJob.objects.exists())
+
+    def test_only_dirty_fields_are_written(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.usersecurityprofile.notify_on_login = False
+        self.assertEqual(user.usersecurityprofile.get_dirty_fields(), ['notify_on_login'])
+        user.save()
+        user.usersecurityprofile.refresh_from_db()
+        self.assertFalse(user.usersecurityprofile.notify_on_login)
+        self.assertEqual(user.usersecurityprofile.get_dirty_fields(), [])
+
+    def test_picture_change_queues_one_image_job(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.save()
+        self.assertFalse(ProfileImageJob.objects.exists())
+        profile.profile_picture = 'profile_pics/new.jpg'
+        profile.save()
+        profile.save()
+        self.assertEqual(
+            list(ProfileImageJob.objects.values_list('image_name', flat=True)),
+            ['profile_pics/new.jpg']
+        )
+
+
+class TokenBlacklistTests(TestCase):
+    """Refresh tokens are checked against the blacklist through the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tokens', 'tokens@example.com', 'password')
+
+    def setUp(self):
+        default_cache.clear()
+
+    def test_issued_token_is_checked_without_queries(self):
+        token = CachedRefreshToken.for_user(self.user)
+        with self.assertNumQueries(0):
+            CachedRefreshToken(str(token))
+
+    def test_blacklisted_token_is_rejected_from_cache(self):
+        token = CachedRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            CachedRefreshToken(str(token))
+
+    def test_refresh_rotates_and_blacklists_old_token(self):
+        old = str(CachedRefreshToken.for_user(self.user))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('token_refresh'), {'refresh': old})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['refresh'], old)
+        response = self.client.post(reverse('token_refresh'), {'refresh': old})
+        self.assertEqual(response.status_code, 401)
+
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        for token in [CachedRefreshToken.for_user(self.user) for _ in range(3)]:
+            token.blacklist()
+        live = CachedRefreshToken.for_user(self.user)
+        OutstandingToken.objects.exclude(jti=live['jti']).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        batches = list(prune_expired(batch_size=2))
+        self.assertEqual(
+            batches,
+            [(BlacklistedToken, 2), (BlacklistedToken, 1), (OutstandingToken, 2), (OutstandingToken, 1)]
+        )
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP unavailable')
+
+
+@override_settings(EMAIL_JOB_BACKEND='queue', REQUIRE_EMAIL_VERIFICATION=True)
+class OutboundEmailTests(TestCase):
+    """Mail is queued in the request and sent in batches by the worker"""
+
+    def test_registration_queues_verification_email(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'Correct-Horse-42!',
+            'password2': 'Correct-Horse-42!',
+        })
+        self.assertRedirects(response, reverse('email_verification_sent'), fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, ['newcomer@example.com'])
+        self.assertIn('/verify-email/', email.html_body)
+
+    @override_settings(EMAIL_BACKEND='users.tests.CountingBackend')
+    def test_batch_shares_one_connection(self):
+        for i in range(3):
+            enqueue_email('Hello', 'Body', [f'reader{i}@example.com'], html_body='<p>Body</p>')
+        CountingBackend.opened = 0
+        self.assertEqual(deliver_emails(claim_jobs(OutboundEmail, 10)), 3)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.DONE).exists())
+
+    @override_settings(EMAIL_BACKEND='users.tests.FailingBackend')
+    def test_failed_send_is_retried_later(self):
+        email = enqueue_email('Hello', 'Body', ['reader@example.com'])
+        self.assertEqual(deliver_emails(claim_jobs(OutboundEmail, 10)), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.run_after, timezone.now())
+        self.assertIn('SMTP unavailable', email.last_error)
+
+
+class TemporaryMediaMixin:
+    """Store uploads in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, name, size, image_format='PNG'):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, format=image_format)
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def set_picture(self, user, size):
+        profile = Profile.objects.get(user=user)
+        profile.profile_picture = self.upload(f'profile_pics/{user.username}.png', size)
+        profile.save()
+        return profile
+
+
+@override_settings(IMAGE_JOB_BACKEND='queue')
+class ProfileImageJobTests(TemporaryMediaMixin, TestCase):
+    """Uploads are resized by the worker, with backoff between failed attempts"""
+
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            User.objects.create_user(f'uploader{i}', f'uploader{i}@example.com', 'password')
+            for i in range(3)
+        ]
+
+    def test_worker_resizes_picture(self):
+        from PIL import Image
+        profile = self.set_picture(self.users[0], (600, 450))
+        job = ProfileImageJob.objects.get(profile=profile)
+        self.assertEqual(job.status, ProfileImageJob.Status.PENDING)
+
+        call_command('process_image_jobs', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProfileImageJob.Status.DONE)
+        self.assertEqual(job.attempts, 1)
+        with default_storage.open(job.image_name, 'rb') as f, Image.open(f) as img:
+            self.assertEqual(img.size, (PROFILE_PICTURE_SIZE[0], 225))
+        profile.refresh_from_db()
+        self.assertEqual(profile.avatar_variants['source'], job.image_name)
+
+    def test_failed_job_backs_off_then_gives_up(self):
+        profile = self.set_picture(self.users[0], (100, 100))
+        ProfileImageJob.objects.filter(profile=profile).update(max_attempts=2)
+
+        def broken(job):
+            raise OSError('storage offline')
+
+        job, = claim_jobs(ProfileImageJob)
+        before = timezone.now()
+        self.assertFalse(run_job(job, handler=broken))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProfileImageJob.Status.PENDING)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=30))
+        self.assertIn('storage offline', job.last_error)
+        # Not due yet
+        self.assertEqual(claim_jobs(ProfileImageJob), [])
+
+        ProfileImageJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job, = claim_jobs(ProfileImageJob)
+        self.assertFalse(run_job(job, handler=broken))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProfileImageJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_worker_drains_the_queue(self):
+        for user in self.users:
+            self.set_picture(user, (320, 320))
+        out = io.StringIO()
+        call_command('process_image_jobs', '--once', '--batch-size', '2', stdout=out)
+        self.assertIn('Processed 3 jobs, 0 failed', out.getvalue())
+        self.assertFalse(ProfileImageJob.objects.exclude(status=ProfileImageJob.Status.DONE).exists())
+
+
+class AvatarTests(TemporaryMediaMixin, TestCase):
+    """Pictures get square derivatives that {% avatar %} offers through srcset"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('portrait', 'portrait@example.com', 'password')
+
+    def render(self, profile):
+        template = Template('{% load avatar_tags %}{% avatar profile "rounded-circle" 64 %}')
+        return template.render(Context({'profile': profile}))
+
+    def test_variants_are_written_for_every_size(self):
+        from PIL import Image
+        name = self.upload('profile_pics/portrait.png', (400, 300))
+        variants = generate_avatar_variants(name)
+        self.assertEqual(variants['source'], name)
+        for fmt, extension in [('webp', 'webp'), ('jpeg', 'jpg')]:
+            files = variants['formats'][fmt]
+            self.assertEqual(sorted(files, key=int), [str(size) for size in AVATAR_SIZES])
+            for size, path in files.items():
+                self.assertTrue(path.endswith(f'{size}.{extension}'))
+                with default_storage.open(path, 'rb') as f, Image.open(f) as img:
+                    self.assertEqual(img.size, (int(size), int(size)))
+
+    def test_tag_renders_srcset(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.profile_picture = self.upload('profile_pics/portrait.png', (400, 400))
+        profile.avatar_variants = generate_avatar_variants(profile.profile_picture.name)
+        html = self.render(profile)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('sizes="64px"', html)
+        for size in AVATAR_SIZES:
+            self.assertIn(f'{size}.jpg {size}w', html)
+        self.assertIn(f'src="{default_storage.url(profile.avatar_variants["formats"]["jpeg"]["64"])}"', html)
+
+    def test_tag_falls_back_to_the_original(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.profile_picture = self.upload('profile_pics/portrait.png', (400, 400))
+        html = self.render(profile)
+        self.assertIn(f'src="{profile.profile_picture.url}"', html)
+        self.assertNotIn('srcset', html)
+
+        # Variants of a replaced picture are not used either
+        profile.avatar_variants = generate_avatar_variants(profile.profile_picture.name)
+        profile.profile_picture = self.upload('profile_pics/replacement.png', (400, 400))
+        self.assertNotIn('srcset', self.render(profile))
+
+
+class PasswordPolicyTests(TestCase):
+    """Breached passwords and disposable domains are looked up in prepared data"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, 'passwords.txt')
+        with open(source, 'w') as f:
+            f.write('Correct-Horse-42!\nhunter2\nTr0ub4dor&3xyz\n')
+        self.breached_file = os.path.join(directory.name, 'breached.bin')
+        call_command('build_breached_passwords', source, plain=True, output=self.breached_file, stdout=io.StringIO())
+
+    def test_breached_lookup_uses_sorted_digests(self):
+        breached = BreachedPasswords(self.breached_file)
+        self.assertEqual(len(breached), 3)
+        for password in ('Correct-Horse-42!', 'hunter2', 'Tr0ub4dor&3xyz'):
+            self.assertIn(password, breached)
+        self.assertNotIn('Battery-Staple-77?', breached)
+
+    def test_register_form_rejects_breached_password(self):
+        data = {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'Correct-Horse-42!',
+            'password2': 'Correct-Horse-42!',
+        }
+        with self.settings(BREACHED_PASSWORDS_FILE=self.breached_file):
+            form = UserRegisterForm(data)
+            self.assertFalse(form.is_valid())
+        self.assertIn('data breach', form.errors['password1'][0])
+        self.assertNotIn('password2', form.errors)
+
+    def test_policy_runs_once_per_registration(self):
+        data = {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'Battery-Staple-77?',
+            'password2': 'Battery-Staple-77?',
+        }
+        with mock.patch('users.password_policy.check_password', wraps=password_policy.check_password) as check:
+            self.assertTrue(UserRegisterForm(data).is_valid())
+        check.assert_called_once_with('Battery-Staple-77?', 'newcomer', 'newcomer@example.com')
+
+        data['password1'] = data['password2'] = 'newcomer-Staple-77?'
+        form = UserRegisterForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors['password1']), 1)
+
+    def test_disposable_domains_match_subdomains(self):
+        check_email('reader@example.com')
+        emails = ('reader@mailinator.com', 'reader@inbox.Mailinator.com', 'reader@sharklasers.com', 'reader@tempr.email')
+        for email in emails:
+            with self.assertRaisesMessage(ValidationError, 'Disposable'):
+                check_email(email)
+
+    def test_disposable_domains_file_can_be_replaced(self):
+        self.assertGreater(len(get_disposable_domains()), 5000)
+        path = os.path.join(os.path.dirname(self.breached_file), 'domains.txt')
+        with open(path, 'w') as f:
+            f.write('# Only one\nexample.org\n')
+        get_disposable_domains.cache_clear()
+        self.addCleanup(get_disposable_domains.cache_clear)
+        with self.settings(DISPOSABLE_EMAIL_DOMAINS_FILE=path):
+            self.assertEqual(get_disposable_domains(), {'example.org'})
+            check_email('reader@mailinator.com')
+
+
+class SecurityStateTests(TestCase):
+    """Lock state is read once per request and cached until the profile changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('guarded', 'guarded@example.com', 'password')
+
+    def setUp(self):
+        default_cache.clear()
+
+    def test_state_is_memoized_on_the_request(self):
+        request = HttpRequest()
+        with self.assertNumQueries(1):
+            state = get_security_state(self.user, request)
+            default_cache.clear()
+            self.assertIs(get_security_state(self.user.pk, request), state)
+        with self.assertNumQueries(1):
+            get_security_state(self.user, HttpRequest())
+
+    def test_state_is_cached_for_its_timeout(self):
+        get_security_state(self.user)
+        # update() sends no signal, so the cached state is now stale
+        UserSecurityProfile.objects.filter(user=self.user).update(failed_login_attempts=3)
+        now = time.time()
+        with mock.patch('django.core.cache.backends.locmem.time') as clock:
+            clock.time.return_value = now + STATE_TIMEOUT - 1
+            with self.assertNumQueries(0):
+                self.assertEqual(get_security_state(self.user).failed_login_attempts, 0)
+            clock.time.return_value = now + STATE_TIMEOUT + 1
+            self.assertEqual(get_security_state(self.user).failed_login_attempts, 3)
+
+    def test_profile_save_and_delete_invalidate_the_cached_state(self):
+        self.assertFalse(get_security_state(self.user).is_locked())
+        profile = UserSecurityProfile.objects.get(user=self.user)
+        profile.account_locked_until = timezone.now() + timedelta(minutes=15)
+        profile.save()
+        self.assertTrue(get_security_state(self.user).is_locked())
+
+        profile.delete()
+        self.assertEqual(get_security_state(self.user), EMPTY_STATE)
+
+    def test_invalidation_during_a_fill_is_not_lost(self):
+        profile = UserSecurityProfile.objects.get(user=self.user)
+
+        def load_then_lock(user_id):
+            # Another request locks the account after this one read the row
+            state = load_security_state(user_id)
+            profile.account_locked_until = timezone.now() + timedelta(minutes=15)
+            profile.save()
+            return state
+
+        with mock.patch('users.security_state.load_security_state', side_effect=load_then_lock):
+            self.assertFalse(get_security_state(self.user).is_locked())
+        self.assertTrue(get_security_state(self.user).is_locked())
+
+
+class FailedLoginTests(TestCase):
+    """Failed logins are counted with one conditional UPDATE, or buffered in the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('forgetful', 'forgetful@example.com', 'password')
+
+    def setUp(self):
+        default_cache.clear()
+        ratelimit_cache.clear()
+
+    def profile(self):
+        return UserSecurityProfile.objects.get(user=self.user)
+
+    def test_failures_are_counted_in_one_update(self):
+        with self.assertNumQueries(1):
+            UserSecurityProfile.record_failed_logins(self.user.pk)
+        UserSecurityProfile.record_failed_logins(self.user.pk, 2)
+        profile = self.profile()
+        self.assertEqual(profile.failed_login_attempts, 3)
+        self.assertIsNotNone(profile.last_failed_login)
+        self.assertIsNone(profile.account_locked_until)
+
+    def test_threshold_locks_and_an_expired_lock_restarts_the_count(self):
+        UserSecurityProfile.record_failed_logins(self.user.pk, LOCKOUT_THRESHOLD - 1)
+        self.assertFalse(self.profile().is_account_locked())
+        UserSecurityProfile.record_failed_logins(self.user.pk)
+        self.assertTrue(self.profile().is_account_locked())
+        self.assertTrue(get_security_state(self.user).is_locked())
+
+        UserSecurityProfile.objects.filter(user=self.user).update(
+            account_locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        UserSecurityProfile.record_failed_logins(self.user.pk)
+        profile = self.profile()
+        self.assertEqual(profile.failed_login_attempts, 1)
+        self.assertIsNone(profile.account_locked_until)
+
+    @override_settings(FAILED_LOGIN_BUFFER=True)
+    def test_buffered_failures_are_flushed_before_the_threshold(self):
+        for _ in range(LOCKOUT_THRESHOLD - 1):
+            record_failed_login(self.user.pk)
+        self.assertEqual(self.profile().failed_login_attempts, 0)
+        state = record_failed_login(self.user.pk)
+        self.assertTrue(state.is_locked())
+        self.assertEqual(self.profile().failed_login_attempts, LOCKOUT_THRESHOLD)
+        self.assertEqual(flush_pending(self.user.pk), 0)
+
+    @override_settings(FAILED_LOGIN_BUFFER=True)
+    def test_successful_login_clears_buffered_failures(self):
+        for _ in range(LOCKOUT_THRESHOLD - 1):
+            record_failed_login(self.user.pk)
+        # The database still shows no failures, only the buffer has them
+        record_successful_login(self.user, get_security_state(self.user))
+        self.assertFalse(record_failed_login(self.user.pk).is_locked())
+        self.assertEqual(flush_pending(self.user.pk), 1)
+        self.assertFalse(self.profile().is_account_locked())
+
+
+class JWTUserCacheTests(TestCase):
+    """API requests resolve their user from a short-lived cache of a few columns"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('caller', 'caller@example.com', 'password')
+
+    def setUp(self):
+        default_cache.clear()
+
+    def get(self):
+        token = CachedRefreshToken.for_user(self.user).access_token
+        return self.client.get(reverse('post-list'), HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_cached_user_skips_the_query(self):
+        with self.assertNumQueries(1):
+            get_auth_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = get_auth_user(self.user.pk)
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'caller', True))
+        self.assertIsNone(get_auth_user(0))
+
+    def test_minimal_user_defers_the_other_columns(self):
+        user = get_auth_user(self.user.pk)
+        self.assertFalse(user._state.adding)
+        self.assertEqual(user._state.db, 'default')
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertNotIn('username', user.get_deferred_fields())
+        # A deferred column is loaded on first access
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'caller@example.com')
+
+    def test_deactivated_and_locked_users_are_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'User is inactive')
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.get().status_code, 200)
+        profile = UserSecurityProfile.objects.get(user=self.user)
+        profile.account_locked_until = timezone.now() + timedelta(minutes=15)
+        profile.save()
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Account is temporarily locked')
+
+
+class ImportBudgetTests(SimpleTestCase):
+    """A cold worker start leaves the heavy optional dependencies unloaded"""
+
+    def test_cold_start_skips_heavy_modules(self):
+        # Outside `manage.py test` the settings want a real cache server
+        modules = loaded_modules(settings_module=settings.SETTINGS_MODULE, environ={'CACHE_URL': 'locmemcache://'})
+        # The worker really started: settings and URLs were loaded
+        self.assertIn(settings.ROOT_URLCONF, modules)
+        self.assertEqual(heavy_modules(modules), [])
+        for module in ('boto3', 'PIL', 'pyotp'):
+            self.assertNotIn(module, modules)
+
+
+class EdgeMiddlewareTests(TestCase):
+    """Access control and headers applied by the consolidated edge middleware"""
+
+    def test_anonymous_user_is_redirected_with_security_headers(self):
+        response = self.client.get(reverse('blog-home'))
+        self.assertRedirects(response, reverse('landing-page'), fetch_redirect_response=False)
+        self.assertIn("object-src 'none'", response['Content-Security-Policy'])
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+    def test_namespaced_public_urls_resolve_by_view_name(self):
+        path = reverse('social:begin', args=['google-oauth2'])
+        self.assertEqual(resolve_url_name(settings.ROOT_URLCONF, path), 'social:begin')
+        self.assertIsNone(resolve_url_name(settings.ROOT_URLCONF, '/no-such-page/'))
+
+    def test_static_files_skip_access_checks(self):
+        response = self.client.get(settings.STATIC_URL + 'missing.css')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+
+    def test_api_requests_with_a_bearer_token_are_left_to_the_api(self):
+        response = self.client.get(reverse('post-list'), HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, 401)
+        # No token, another scheme, or a token sent to a page
+        for path, header in [
+            (reverse('post-list'), None),
+            (reverse('post-list'), 'Basic c3luY2VyOnBhc3N3b3Jk'),
+            (reverse('blog-home'), 'Bearer not-a-token'),
+        ]:
+            headers = {'HTTP_AUTHORIZATION': header} if header else {}
+            with self.subTest(path=path, header=header):
+                response = self.client.get(path, **headers)
+                self.assertRedirects(response, reverse('landing-page'), fetch_redirect_response=False)
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+    """Sampled requests report their cost and feed the shared statistics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('measured', 'measured@example.com', 'password')
+        Post.objects.create(title='Measured post', content='Body', author=cls.user)
+
+    def setUp(self):
+        default_cache.clear()
+        page_cache.clear()
+        self.client.force_login(self.user)
+
+    def test_server_timing_reports_queries_render_and_cache(self):
+        response = self.client.get(reverse('blog-home'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertRegex(timing, r'render;dur=[0-9.]+')
+        self.assertRegex(timing, r'cache;desc="[0-9]+ hits [1-9][0-9]* misses"')
+
+    def test_published_statistics_are_collected_per_view(self):
+        perfstats.reset()
+        for _ in range(2):
+            self.client.get(reverse('blog-home'))
+        perfstats.publish()
+        views, processes = perfstats.collect()
+        entry = views['GET blog-home']
+        self.assertEqual(processes, 1)
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(sum(entry['buckets']), 2)
+        # The second request is served from the feed cache
+        self.assertGreater(entry['cache_hits'], 0)
+        self.assertGreater(entry['bytes'], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse('blog-home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class SlowReadCache:
+    """Widens the gap between reading a counter and acting on it"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+    def get(self, *args, **kwargs):
+        value = self.cache.get(*args, **kwargs)
+        time.sleep(0.01)
+        return value
+
+    def get_many(self, *args, **kwargs):
+        values = self.cache.get_many(*args, **kwargs)
+        time.sleep(0.01)
+        return values
+
+
+class RateLimiterTests(SimpleTestCase):
+    """Window counters are bumped before they are checked"""
+
+    def setUp(self):
+        ratelimit_cache.clear()
+        clock = mock.patch('users.rate_limiting.time')
+        self.time = clock.start().time
+        self.addCleanup(clock.stop)
+
+    def hits(self, limiter, count, limit=3, period=100):
+        return [limiter.hit('tests', limit, period).allowed for _ in range(count)]
+
+    def test_fixed_window_denies_at_the_limit_until_rollover(self):
+        limiter = FixedWindowLimiter()
+        self.time.return_value = 1030
+        self.assertEqual(self.hits(limiter, 4), [True, True, True, False])
+        self.assertEqual(limiter.hit('tests', 3, 100).retry_after, 70)
+        self.time.return_value = 1100
+        self.assertEqual(self.hits(limiter, 4), [True, True, True, False])
+
+    def test_sliding_window_weights_the_previous_window(self):
+        limiter = SlidingWindowLimiter()
+        self.time.return_value = 1000
+        self.assertEqual(self.hits(limiter, 5, limit=4), [True] * 4 + [False])
+        # Half of the previous window still overlaps: 4 * 0.5 + 2 reaches the limit
+        self.time.return_value = 1150
+        self.assertEqual(self.hits(limiter, 3, limit=4), [True, True, False])
+        # Refused hits are not counted: 4 * 0.25 + 2 leaves room for one
+        self.time.return_value = 1175
+        self.assertEqual(self.hits(limiter, 2, limit=4), [True, False])
+        self.time.return_value = 1200
+        self.assertEqual(self.hits(limiter, 2, limit=4), [True, False])
+
+    def test_engine_follows_the_settings(self):
+        self.assertIsInstance(get_rate_limiter(), SlidingWindowLimiter)
+        with self.settings(RATE_LIMIT_ENGINE='users.rate_limiting.FixedWindowLimiter'):
+            self.assertIsInstance(get_rate_limiter(), FixedWindowLimiter)
+        # Counters go through the proxy, which resolves the calling thread's connection
+        self.assertIs(get_rate_limiter().cache, ratelimit_cache)
+
+    def test_concurrent_hits_never_exceed_the_limit(self):
+        self.time.return_value = 1000
+        for limiter in (FixedWindowLimiter(), SlidingWindowLimiter()):
+            ratelimit_cache.clear()
+            limiter.cache = SlowReadCache(limiter.cache)
+            barrier = threading.Barrier(20)
+
+            def hit():
+                barrier.wait()
+                return limiter.hit('tests', 5, 100).allowed
+
+            with ThreadPoolExecutor(20) as pool:
+                results = list(pool.map(lambda _: hit(), range(20)))
+            self.assertEqual(results.count(True), 5, limiter)
+
+
+# Keep the replayed requests out of the in-process perfstats totals
+@override_settings(PERF_SAMPLE_RATE=0)
+class LoadTestTests(TestCase):
+    """The bulk factories and one short replay through the test client"""
+
+    def test_factories_create_profiles_and_index_posts(self):
+        self.assertEqual(factories.create_users(5, prefix='seed'), 5)
+        self.assertEqual(factories.create_users(6, prefix='seed'), 1)
+        users = User.objects.filter(username__startswith='seed-')
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 6)
+        self.assertEqual(UserSecurityProfile.objects.filter(user__in=users).count(), 6)
+
+        factories.create_posts(20, users.values_list('pk', flat=True))
+        self.assertEqual(Post.objects.count(), 20)
+        word = Post.objects.first().title.split()[0]
+        self.client.force_login(users[0])
+        response = self.client.get(reverse('post-search'), {'q': word})
+        self.assertGreater(len(response.context['posts']), 0)
+
+    def test_mixed_workload_runs_without_errors(self):
+        password = factories.random_password()
+        factories.create_users(3, password=password)
+        factories.create_posts(10, User.objects.values_list('pk', flat=True))
+        fixture = Fixture(
+            [factories.username(factories.DEFAULT_PREFIX, i) for i in range(3)],
+            list(Post.objects.values_list('id', 'date_posted')),
+            password,
+        )
+        samples, seconds = runner.run(
+            runner.ClientTransport(), WORKLOADS['mixed'], fixture, 60, virtual_users=2
+        )
+        result = runner.report(samples, seconds)
+        self.assertEqual(result['total']['requests'], 60)
+        self.assertEqual(result['total']['errors'], 0)
+        for figures in result['endpoints'].values():
+            self.assertLessEqual(figures['p50_ms'], figures['p99_ms'])
+            self.assertGreater(figures['queries_mean'], 0)
+
+    def test_seeding_a_server_is_opt_in_and_guarded(self):
+        url = 'http://127.0.0.1:9'
+        with self.assertRaisesMessage(CommandError, '--seed'):
+            call_command('loadtest', '--url', url, stdout=io.StringIO())
+        # Tests run with DEBUG off
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('loadtest', '--url', url, '--seed', stdout=io.StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_seeded_users_share_a_new_password(self):
+        factories.create_users(2, prefix='seed', password='first-run')
+        password = factories.random_password()
+        self.assertNotEqual(password, factories.random_password())
+        self.assertEqual(factories.set_password('seed', password), 2)
+        for user in User.objects.filter(username__startswith='seed-'):
+            self.assertTrue(user.check_password(password))
@@ -0,0 +1,108 @@
+"""
+Refresh-token blacklist with a cache front.
+
+simplejwt answers "is this refresh token blacklisted?" with a join over the
+token_blacklist tables on every refresh and logout, and those tables grow
+with every rotation. Here the answer is cached per jti for the rest of the
+token's lifetime:
+  - tokens issued through CachedRefreshToken are recorded as not blacklisted
+  - saving a BlacklistedToken (logout, rotation, admin) flips the entry to
+    blacklisted once the transaction commits
+  - misses (evicted entries, tokens issued elsewhere) read the database once
+Negative entries are only written with add(), so a lookup racing a logout can
+never overwrite the positive entry. Expired rows are removed by
+``manage.py prune_token_blacklist``.
+"""
+import time
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from django_blog_project.cache import default_cache, make_key
+
+
+def _cache_key(jti):
+    return make_key('jwt', 'blacklisted', jti)
+
+
+def _timeout(expires_at):
+    """Seconds until an epoch timestamp, at least one"""
+    return max(int(expires_at - time.time()), 1)
+
+
+def is_blacklisted(jti, expires_at):
+    """Whether a refresh token is blacklisted; `expires_at` is its exp claim"""
+    key = _cache_key(jti)
+    blacklisted = default_cache.get(key)
+    if blacklisted is None:
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        default_cache.add(key, blacklisted, _timeout(expires_at))
+    return blacklisted
+
+
+def remember_issued(token):
+    """Record a freshly issued refresh token as not blacklisted"""
+    default_cache.add(_cache_key(token[api_settings.JTI_CLAIM]), False, _timeout(token['exp']))
+
+
+def remember_blacklisted(jti, expires_at):
+    """Record a blacklisted token once the surrounding transaction commits"""
+    transaction.on_commit(
+        lambda: default_cache.set(_cache_key(jti), True, _timeout(expires_at))
+    )
+
+
+def forget(jti):
+    default_cache.delete(_cache_key(jti))
+
+
+class CachedRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check goes through the cache front"""
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        remember_issued(token)
+        return token
+
+    def rotate(self):
+        """
+        Turn this token into a new refresh token, blacklisting the old one
+        when BLACKLIST_AFTER_ROTATION is set (as TokenRefreshSerializer does)
+        """
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            self.blacklist()
+        self.set_jti()
+        self.set_exp()
+        self.set_iat()
+        remember_issued(self)
+        return self
+
+
+def prune_expired(batch_size=1000, pause=0, now=None):
+    """
+    Delete blacklist rows of expired tokens, then the expired outstanding
+    tokens, `batch_size` rows per statement so no single delete holds locks
+    for long. Yields (model, deleted) after every batch.
+    """
+    cutoff = now or timezone.now()
+    for queryset in (
+        BlacklistedToken.objects.filter(token__expires_at__lt=cutoff),
+        OutstandingToken.objects.filter(expires_at__lt=cutoff),
+    ):
+        model = queryset.model
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            model.objects.filter(pk__in=ids).delete()
+            yield model, len(ids)
+            if pause:
+                time.sleep(pause)
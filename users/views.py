@@ -30,6 +30,8 @@ from .rate_limiting import (
     login_rate_limit
 )
 from .decorators import check_account_lockout, require_2fa
+from .security_state import get_security_state
+from .login_failures import record_failed_login, record_successful_login
 from .email_verification import EmailVerifier
 
 import logging
@@ -47,13 +49,13 @@ class RateLimitedLoginView(LoginView):
     def form_valid(self, form):
         """Handle successful login attempt"""
         user = form.get_user()
-        security_profile = user.usersecurityprofile
+        security_state = get_security_state(user, self.request)
         
-        # Reset failed login attempts on successful login
-        security_profile.reset_login_attempts()
+        # Reset failed login attempts on successful login (only write if there is something to reset)
+        record_successful_login(user, security_state)
         
         # Check if password change is required
-        if security_profile.should_change_password():
+        if security_state.should_change_password():
             messages.warning(
                 self.request,
                 'Your password needs to be updated. Please change it now.'
@@ -61,7 +63,7 @@ class RateLimitedLoginView(LoginView):
             return redirect('password_change')
         
         # Check if 2FA is required
-        if security_profile.two_factor_enabled:
+        if security_state.two_factor_enabled:
             self.request.session['partial_login_user_id'] = user.id
             return redirect('2fa-verify')
         
@@ -72,21 +74,20 @@ class RateLimitedLoginView(LoginView):
         try:
             username = form.cleaned_data.get('username') if form.cleaned_data else None
             if username:
-                try:
-                    user = User.objects.get(username=username)
-                    security_profile = user.usersecurityprofile
-                    security_profile.record_failed_login()
+                user_id = User.objects.filter(username=username).values_list('pk', flat=True).first()
+                if user_id is None:
+                    # Don't reveal whether username exists
+                    logger.info(f"Failed login attempt for non-existent user: {username}")
+                else:
+                    # One conditional UPDATE (or a cache increment when buffered)
+                    security_state = record_failed_login(user_id, self.request)
                     
-                    if security_profile.is_account_locked():
+                    if security_state.is_locked():
                         messages.error(
                             self.request,
                             'Account temporarily locked due to multiple failed attempts.'
                         )
                         logger.warning(f"Account locked for user {username}")
-                except User.DoesNotExist:
-                    # Don't reveal whether username exists
-                    logger.info(f"Failed login attempt for non-existent user: {username}")
-                    pass
         except Exception as e:
             logger.error(f"Error in login attempt: {str(e)}")
             